@@ -0,0 +1,130 @@
+"""asv benchmarks of reading TableBuilder files, see asv.conf.json.
+
+Files are generated with `table_builder_io.testing`, at sizes from small extracts up to tables with ~10 million cells,
+the order of TableBuilder's limit on the size of a table. Run with e.g. `asv run` or `asv continuous master HEAD`.
+"""
+
+from pathlib import Path
+
+from table_builder_io import TableBuilderReader
+from table_builder_io.buffer import iter_lines
+from table_builder_io.reader import _parse_data_headers, _parse_main_table
+from table_builder_io.testing import make_table_builder_csv, write_table_builder_csv
+
+# name: (rows, columns, wafers) of the generated table
+SIZES = {
+    "10k_cells": (100, 100, 0),
+    "1M_cells": (5000, 200, 0),
+    "1M_cells_4_wafers": (1250, 200, 4),
+    "10M_cells": (50000, 200, 0),
+}
+# name: generator options, for the level structure of the labels
+LAYOUTS = {
+    "flat": dict(row_levels=1, col_levels=1),
+    "multilevel": dict(row_levels=3, col_levels=2),
+}
+
+
+def _file_name(size: str, layout: str) -> str:
+    return f"{size}-{layout}.csv"
+
+
+class ReadTableSuite:
+    """Wall time and peak memory of each stage of reading a file, from the file on disk to the output frame."""
+
+    params = (list(SIZES), list(LAYOUTS))
+    param_names = ["size", "layout"]
+    timeout = 600
+
+    def setup_cache(self):
+        # generated once per benchmark run, in the (temporary) working directory asv provides
+        for size, (rows, cols, wafers) in SIZES.items():
+            for layout, options in LAYOUTS.items():
+                write_table_builder_csv(
+                    _file_name(size, layout),
+                    num_rows=rows,
+                    num_cols=cols,
+                    num_wafers=wafers,
+                    filters=[("STATE (UR)", "Queensland")],
+                    **options,
+                )
+        return str(Path.cwd())
+
+    def setup(self, directory: str, size: str, layout: str):
+        self.path = Path(directory) / _file_name(size, layout)
+        self.reader = TableBuilderReader.from_file(self.path)
+        self.raw_body = self.reader.raw_body
+        # the body of the first (or only) table, for the benchmarks of its stages
+        index = self.reader.section_index
+        self.table_body = self.raw_body if not index.wafers else self.reader._get_buffer()[slice(*index.wafers[0][1])]
+        self.parsed_table = _parse_main_table(self.table_body)
+
+    def time_from_file(self, *_):
+        TableBuilderReader.from_file(self.path)
+
+    def time_from_mmap(self, *_):
+        TableBuilderReader.from_mmap(self.path).section_index
+
+    def time_split_metadata(self, *_):
+        TableBuilderReader.from_file(self.path).split_metadata()
+
+    def time_parse_data_headers(self, *_):
+        _parse_data_headers(iter_lines(self.table_body, 0, len(self.table_body)))
+
+    def time_parse_main_table(self, *_):
+        _parse_main_table(self.table_body)
+
+    def time_parse_main_table_numpy(self, *_):
+        _parse_main_table(self.table_body, engine="numpy")
+
+    def time_parse_main_table_pyarrow(self, *_):
+        _parse_main_table(self.table_body, engine="pyarrow")
+
+    def time_get_df(self, *_):
+        self.parsed_table.get_df(as_index=True)
+
+    def time_get_df_flat(self, *_):
+        self.parsed_table.get_df(as_index=False)
+
+    def time_read_table(self, *_):
+        TableBuilderReader.from_file(self.path).read_table()
+
+    def time_read_table_to_long_format(self, *_):
+        TableBuilderReader.from_file(self.path).read_table_to_long_format()
+
+    def time_read_table_to_long_records(self, *_):
+        TableBuilderReader.from_file(self.path).read_table_to_long_records()
+
+    def peakmem_from_file(self, *_):
+        TableBuilderReader.from_file(self.path).section_index
+
+    def peakmem_from_mmap(self, *_):
+        TableBuilderReader.from_mmap(self.path).section_index
+
+    def peakmem_read_table(self, *_):
+        TableBuilderReader.from_file(self.path).read_table()
+
+    def peakmem_read_table_mmap_numpy(self, *_):
+        TableBuilderReader.from_mmap(self.path).read_table(engine="numpy")
+
+    def peakmem_read_table_to_long_format(self, *_):
+        TableBuilderReader.from_file(self.path).read_table_to_long_format()
+
+    def peakmem_read_table_to_long_records(self, *_):
+        TableBuilderReader.from_file(self.path).read_table_to_long_records()
+
+
+class WideHeaderSuite:
+    """Parsing the column headers of very wide tables (e.g. SA1 level column dimensions), which is repeated for every
+    wafer."""
+
+    params = ([10_000, 60_000], [1, 3])
+    param_names = ["columns", "col_levels"]
+
+    def setup(self, columns: int, col_levels: int):
+        row_levels = max(2, col_levels)  # multilevel columns need multilevel rows
+        text = make_table_builder_csv(num_rows=3, num_cols=columns, row_levels=row_levels, col_levels=col_levels)
+        self.table_body = TableBuilderReader.from_string(text).raw_body
+
+    def time_parse_data_headers(self, *_):
+        _parse_data_headers(iter_lines(self.table_body, 0, len(self.table_body)))
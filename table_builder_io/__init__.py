@@ -1,5 +1,9 @@
 """Tool for reading ABS TableBuilder datasets easily in Python."""
 
-from .reader import TableBuilderReader
-
 __version__ = "0.2.0"
+
+from .reader import TableBuilderReader, LazyWafers, SparseTable, PeekInfo
+from .batch import read_many
+from .cache import TableCache
+from .catalog import Catalog, CatalogEntry
+from .stats import ReadStats
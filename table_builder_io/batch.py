@@ -0,0 +1,99 @@
+"""Reading collections of TableBuilder files (e.g. one extract per state of a census release) in one go."""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+from typing_extensions import Literal
+
+from table_builder_io.parse_metadata import HeaderInfo
+from table_builder_io.reader import TableBuilderReader
+
+# HeaderInfo fields which must agree for files to be combined, filters are expected to differ (e.g. by state)
+COMPATIBILITY_FIELDS = ("dataset", "counting", "variables")
+
+Table = Union[pd.DataFrame, Dict[str, pd.DataFrame]]
+
+
+def read_many(
+    paths: Union[Path, str, Iterable[Union[Path, str]]],
+    *,
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    combine: Literal["concat", "dict"] = "concat",
+    as_index=True,
+    drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+    check_compatible: bool = True,
+) -> Union[Table, Dict[str, Table]]:
+    """Read a collection of TableBuilder files concurrently.
+
+    paths: the files to read, or a directory, in which case all the `*.csv` files it contains are read.
+    workers / executor: number of processes to use in a new `ProcessPoolExecutor` (defaults to the number of CPUs),
+        or an existing `concurrent.futures.Executor` to read files with. workers=1 reads serially.
+    combine="concat" concatenates the tables into a single frame, with an outer index level "source" containing
+        the path of each file. Files with wafers are concatenated wafer by wafer, returning a dict of frames.
+    combine="dict" returns a dict mapping the path of each file to its table.
+    as_index, drop_totals: as in `TableBuilderReader.read_table`
+    check_compatible: raise a ValueError if files don't share the same header dataset, counting and variables.
+    """
+    if combine not in ("concat", "dict"):
+        raise ValueError(f"Unknown combine option {combine!r}, expected 'concat' or 'dict'")
+    if workers is not None and executor is not None:
+        raise ValueError("Only one of 'workers' or 'executor' should be supplied")
+
+    if isinstance(paths, (str, Path)) and Path(paths).is_dir():
+        paths = sorted(Path(paths).glob("*.csv"))
+    sources = [str(p) for p in paths]
+
+    args = (sources, repeat(as_index), repeat(drop_totals))
+    if executor is not None:
+        results = list(executor.map(_read_file, *args))
+    elif workers == 1:
+        results = list(map(_read_file, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_read_file, *args))
+
+    headers = [header for header, _ in results]
+    tables = [table for _, table in results]
+    if check_compatible:
+        _check_compatible(sources, headers)
+
+    if combine == "dict":
+        return dict(zip(sources, tables))
+    return _concat_tables(sources, tables)
+
+
+def _read_file(
+    path: str, as_index: bool, drop_totals: Optional[Literal["rows", "columns", "both"]]
+) -> Tuple[HeaderInfo, Table]:
+    """Read a single file, module level so it can be used by a process pool."""
+    reader = TableBuilderReader.from_mmap(path)
+    return reader.read_header_metadata(), reader.read_table(as_index=as_index, drop_totals=drop_totals)
+
+
+def _check_compatible(sources: List[str], headers: List[HeaderInfo]):
+    for source, header in zip(sources[1:], headers[1:]):
+        for field in COMPATIBILITY_FIELDS:
+            expected, actual = getattr(headers[0], field), getattr(header, field)
+            if expected != actual:
+                raise ValueError(
+                    f"Incompatible {field} between '{sources[0]}' and '{source}':\n{expected!r}\n{actual!r}"
+                )
+
+
+def _concat_tables(sources: List[str], tables: List[Table]) -> Table:
+    if len(tables) == 0:
+        raise ValueError("No files to read")
+
+    if all(isinstance(t, pd.DataFrame) for t in tables):
+        return pd.concat(tables, keys=sources, names=["source"])
+    elif all(isinstance(t, dict) for t in tables):
+        titles = list(tables[0].keys())
+        if any(list(t.keys()) != titles for t in tables):
+            raise ValueError("Files with wafers can only be concatenated if they have the same wafers")
+        return {title: pd.concat([t[title] for t in tables], keys=sources, names=["source"]) for title in titles}
+    else:
+        raise ValueError("Can't concatenate files with wafers and files without wafers, use combine='dict'")
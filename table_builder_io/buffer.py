@@ -0,0 +1,310 @@
+"""Utilities for working with the contents of a TableBuilder file as a single buffer using offsets, rather than as a
+list of python lines.
+
+The buffer is either a str (files read as text), or a bytes-like object such as an `mmap`, in which case
+it is only decoded a piece at a time as needed.
+"""
+
+import bisect
+import io
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Pattern, Sequence, Tuple, Union, IO
+
+from table_builder_io.regexes import ABS_HEADER_METADATA_PATTERN, ABS_FOOTER_METADATA_PATTERN, WAFER_ROW
+
+ENCODING = "utf-8"
+
+# Every wafer title line starts with this, used to jump between candidate lines with find (memchr speed)
+# rather than running WAFER_ROW over the whole body.
+WAFER_ROW_PREFIX = '" '
+
+Span = Tuple[int, int]
+
+
+@dataclass
+class SectionIndex:
+    """Location of the parts of a TableBuilder file, as (start, end) offsets into its buffer.
+
+    Spans exclude surrounding blank lines, consistent with `TableBuilderReader.split_metadata`.
+    Args:
+        header: span of the header metadata
+        body: span of the table(s) between the header and footer, including wafer titles
+        footer: span of the footer metadata
+        wafers: (title, span) of each wafer in file order, the span excluding the title line.
+            Empty if the body is a single table with no wafers
+    """
+
+    header: Span
+    body: Span
+    footer: Span
+    wafers: List[Tuple[str, Span]]
+
+
+class _BufferSlice(io.RawIOBase):
+    """Read only file-like view of buffer[start:end], which copies out at most one read request at a time.
+
+    This lets `pd.read_csv` consume part of a memory map without the region being copied into a new bytes object.
+    """
+
+    def __init__(self, buffer, start: int, end: int):
+        super().__init__()
+        self._view = memoryview(buffer)
+        self._pos = start
+        self._end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), self._end - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        # release the export on the underlying buffer, otherwise the mmap can't be closed
+        self._view.release()
+        super().close()
+
+
+def as_buffer_type(buffer, value: str) -> Union[str, bytes]:
+    return value if isinstance(buffer, str) else value.encode(ENCODING)
+
+
+def pattern_for(buffer, pattern: Union[Pattern, str]) -> Pattern:
+    """Compile `pattern` to match the buffer type, so that bytes buffers can be searched without decoding."""
+    pattern = re.compile(pattern)
+    if isinstance(buffer, str) or isinstance(pattern.pattern, bytes):
+        return pattern
+    return re.compile(pattern.pattern.encode(ENCODING), pattern.flags & ~re.UNICODE)
+
+
+def open_span(buffer, start: int, end: int) -> IO:
+    """Open buffer[start:end] as a file handle (binary for bytes-like buffers)."""
+    if isinstance(buffer, str):
+        return io.StringIO(buffer[start:end])
+    return io.BufferedReader(_BufferSlice(buffer, start, end))
+
+
+def decode_span(buffer, start: int, end: int) -> str:
+    if isinstance(buffer, str):
+        return buffer[start:end]
+    return bytes(buffer[start:end]).decode(ENCODING)
+
+
+def strip_newlines(buffer, start: int, end: int) -> Span:
+    """Offset equivalent of `str.strip("\\n")`"""
+    newline = as_buffer_type(buffer, "\n")
+    while start < end and buffer[start : start + 1] == newline:
+        start += 1
+    while end > start and buffer[end - 1 : end] == newline:
+        end -= 1
+    return start, end
+
+
+def iter_lines(buffer, start: int, end: int) -> Iterator[str]:
+    """Lazily decode the lines in buffer[start:end] (newline excluded), one at a time."""
+    newline = as_buffer_type(buffer, "\n")
+    pos = start
+    while pos < end:
+        nl = buffer.find(newline, pos, end)
+        if nl == -1:
+            nl = end
+        yield decode_span(buffer, pos, nl)
+        pos = nl + 1
+
+
+def count_lines(buffer, start: int, end: int, chunk_size: int = 2**20) -> int:
+    """Number of lines in buffer[start:end], counting a final line without a newline."""
+    if start >= end:
+        return 0
+    newline = as_buffer_type(buffer, "\n")
+    if isinstance(buffer, (str, bytes)):
+        count = buffer.count(newline, start, end)
+    else:  # e.g. mmap, which has no count method; count one bounded chunk at a time
+        count = sum(buffer[pos : min(pos + chunk_size, end)].count(newline) for pos in range(start, end, chunk_size))
+    return count + (buffer[end - 1 : end] != newline)
+
+
+def skip_lines(buffer, start: int, end: int, num_lines: int) -> int:
+    """Offset of the start of the line `num_lines` lines after `start`."""
+    newline = as_buffer_type(buffer, "\n")
+    pos = start
+    for _ in range(num_lines):
+        nl = buffer.find(newline, pos, end)
+        if nl == -1:
+            return end
+        pos = nl + 1
+    return pos
+
+
+def _last_lines_start(buffer, num_lines: int) -> int:
+    newline = as_buffer_type(buffer, "\n")
+    pos = len(buffer)
+    if buffer[pos - 1 : pos] == newline:
+        pos -= 1  # the terminating newline doesn't start another line
+    for _ in range(num_lines):
+        nl = buffer.rfind(newline, 0, pos)
+        if nl == -1:
+            return 0
+        pos = nl
+    return pos + 1
+
+
+def index_sections(
+    buffer,
+    max_extent: int,
+    header_pattern: Union[Pattern, str] = ABS_HEADER_METADATA_PATTERN,
+    footer_pattern: Union[Pattern, str] = ABS_FOOTER_METADATA_PATTERN,
+    wafer_candidates: Optional[Sequence[int]] = None,
+) -> SectionIndex:
+    """Locate the header, footer and wafers of a TableBuilder file in a single pass over its buffer.
+
+    Like `_extract_header` / `_extract_footer`, only the first and last `max_extent` lines are searched for the
+    header and footer. Nothing is copied other than the (short) wafer titles.
+    wafer_candidates are the (sorted) starts of candidate wafer title lines if already known, see `WaferScanner`.
+    """
+    header_span, body_start = locate_header(buffer, max_extent, header_pattern)
+    footer_span, body_end = locate_footer(buffer, max_extent, footer_pattern, body_start)
+    body_span = strip_newlines(buffer, body_start, body_end)
+
+    wafers = list(iter_wafer_spans(buffer, *body_span, candidates=wafer_candidates))
+    return SectionIndex(header_span, body_span, footer_span, wafers)
+
+
+def locate_header(buffer, max_extent: int, pattern: Union[Pattern, str]) -> Tuple[Span, int]:
+    """Span of the header in the first `max_extent` lines of the buffer, and the offset just after it."""
+    pattern = pattern_for(buffer, pattern)
+    header_region_end = skip_lines(buffer, 0, len(buffer), max_extent)
+    m = pattern.match(buffer, 0, header_region_end)
+    if m is None:
+        raise ValueError(
+            f"No match could be found in header text:\n{decode_span(buffer, 0, header_region_end)}\n"
+            f" pattern is:\n{pattern.pattern}"
+        )
+    return strip_newlines(buffer, m.start(), m.end()), m.end()
+
+
+def locate_footer(buffer, max_extent: int, pattern: Union[Pattern, str], start: int = 0) -> Tuple[Span, int]:
+    """Span of the footer in the last `max_extent` lines of the buffer (not before `start`), and its start offset."""
+    pattern = pattern_for(buffer, pattern)
+    footer_region_start = _last_lines_start(buffer, max_extent)
+    m = pattern.search(buffer, max(footer_region_start, start))
+    if m is None:
+        raise ValueError(
+            f"No match could be found in footer text:\n{decode_span(buffer, footer_region_start, len(buffer))}\n"
+            f" pattern is:\n{pattern.pattern}"
+        )
+    return strip_newlines(buffer, m.start(), m.end()), m.start()
+
+
+def read_head(f: IO[bytes], num_lines: int, block_size: int = 2**16) -> bytes:
+    """The start of the binary file f containing (at least) its first `num_lines` lines, read a block at a time."""
+    head = b""
+    while head.count(b"\n") < num_lines:
+        block = f.read(block_size)
+        if not block:
+            break
+        head += block
+    return head
+
+
+def read_tail(f: IO[bytes], num_lines: int, block_size: int = 2**16) -> Tuple[int, bytes]:
+    """The offset and contents of the end of the seekable binary file f, containing (at least) its last `num_lines`
+    lines and the newline before them, read a block at a time backwards from the end."""
+    start = f.seek(0, io.SEEK_END)
+    tail = b""
+    while start > 0 and tail.count(b"\n") <= num_lines:
+        block_start = max(0, start - block_size)
+        f.seek(block_start)
+        tail = f.read(start - block_start) + tail
+        start = block_start
+    return start, tail
+
+
+def crlf_to_lf(raw: bytes) -> bytes:
+    """Translate Windows (CRLF) line endings to LF, so the patterns (which expect LF) match."""
+    return raw.replace(b"\r\n", b"\n")
+
+
+def lf_offset(raw: bytes, offset: int) -> int:
+    """The offset into `crlf_to_lf(raw)` of the line start or end at `offset` into raw."""
+    return offset - raw.count(b"\r\n", 0, offset)
+
+
+def raw_offset(raw: bytes, offset: int) -> int:
+    """The offset into raw of the line start or end at `offset` into `crlf_to_lf(raw)`, the inverse of `lf_offset`."""
+    num_crlf = 0
+    for m in re.finditer(rb"\r\n", raw):
+        if m.start() - num_crlf >= offset:
+            break
+        num_crlf += 1
+    return offset + num_crlf
+
+
+def iter_wafer_spans(
+    buffer, start: int, end: int, candidates: Optional[Sequence[int]] = None
+) -> Iterator[Tuple[str, Span]]:
+    """Incrementally find the wafers within the body buffer[start:end], yielding (title, body span) pairs.
+
+    Yields nothing if the body is a single table with no wafers. candidates are the (sorted) starts of lines which
+    could be wafer titles, found by scanning the body if not supplied.
+    """
+    pattern = pattern_for(buffer, WAFER_ROW)
+    if candidates is None:
+        line_starts = _iter_candidate_lines(buffer, start, end)
+    else:
+        line_starts = (pos for pos in candidates[bisect.bisect_left(candidates, start) :] if pos < end)
+
+    title, body_start = None, None
+    for line_start in line_starts:
+        m = pattern.match(buffer, line_start, end)
+        if m is not None:
+            # Like `WAFER_ROW.split`, any text before the first wafer title is discarded
+            if title is not None:
+                yield title, strip_newlines(buffer, body_start, m.start())
+            title, body_start = decode_span(buffer, m.start(1), m.end(1)), m.end()
+    if title is not None:
+        yield title, strip_newlines(buffer, body_start, end)
+
+
+def _iter_candidate_lines(buffer, start: int, end: int) -> Iterator[int]:
+    prefix = as_buffer_type(buffer, WAFER_ROW_PREFIX)
+    candidate_marker = as_buffer_type(buffer, "\n" + WAFER_ROW_PREFIX)
+    # start is the beginning of a line, other candidate lines are found after a newline
+    if buffer[start : start + len(prefix)] == prefix:
+        yield start
+    while True:
+        nl = buffer.find(candidate_marker, start, end)
+        if nl == -1:
+            return
+        start = nl + 1
+        yield start
+
+
+class WaferScanner:
+    """Finds candidate wafer title lines in a bytes buffer as it grows, e.g. while a file is being downloaded.
+
+    Call `feed` after each chunk is appended, then pass `candidates` to `index_sections`, so the body doesn't need
+    to be scanned again once it is complete.
+    """
+
+    _MARKER = ("\n" + WAFER_ROW_PREFIX).encode(ENCODING)
+
+    def __init__(self):
+        self.candidates: List[int] = []
+        self._scanned = 0  # offset up to which the buffer has been searched
+
+    def feed(self, buffer: Union[bytes, bytearray]):
+        # the marker may straddle the previous and new chunk
+        pos = max(0, self._scanned - len(self._MARKER) + 1)
+        while True:
+            nl = buffer.find(self._MARKER, pos)
+            if nl == -1:
+                break
+            self.candidates.append(nl + 1)
+            pos = nl + 1
+        self._scanned = len(buffer)
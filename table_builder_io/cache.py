@@ -0,0 +1,201 @@
+"""Opt-in on disk cache of parsed TableBuilder tables, so the same extract doesn't need to be re-parsed on every run."""
+
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import pandas as pd
+from typing_extensions import Literal
+
+from table_builder_io import __version__
+from table_builder_io.parse_metadata import HeaderInfo
+from table_builder_io.reader import TableBuilderReader
+
+# bump if the layout of cache entries changes, so that old entries are no longer matched
+CACHE_FORMAT_VERSION = 1
+
+Table = Union[pd.DataFrame, Dict[str, pd.DataFrame]]
+
+
+class TableCache:
+    """Cache of parsed tables, stored as parquet files in `directory` (requires pyarrow).
+
+    Entries are keyed by a fingerprint of the source file together with the reader method and arguments, so a
+    modified file or different arguments are a cache miss rather than a stale hit.
+
+    fingerprint="stat" uses the size and modification time of the file, which is cheap to compute.
+    fingerprint="content" uses a hash of the file contents, which is robust to files being copied or touched,
+        at the cost of reading the file on every lookup.
+    max_bytes limits the total size of the cache, least recently used entries are evicted when it is exceeded.
+
+    Usage:
+        cache = TableCache("~/.cache/table_builder_io", max_bytes=10 * 2**30)
+        df = cache.read_table("extract.csv", as_index=True)  # parsed and stored
+        df = cache.read_table("extract.csv", as_index=True)  # loaded from parquet
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(
+        self,
+        directory: Union[Path, str],
+        *,
+        max_bytes: Optional[int] = None,
+        fingerprint: Literal["stat", "content"] = "stat",
+    ):
+        if fingerprint not in ("stat", "content"):
+            raise ValueError(f"Unknown fingerprint option {fingerprint!r}, expected 'stat' or 'content'")
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def read_table(
+        self,
+        path: Union[Path, str],
+        *,
+        as_index=True,
+        drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+    ) -> Table:
+        """Cached equivalent of `TableBuilderReader.read_table`"""
+        return self._get_or_parse(path, "read_table", as_index=as_index, drop_totals=drop_totals)
+
+    def read_table_to_long_format(
+        self,
+        path: Union[Path, str],
+        *,
+        as_index=True,
+        drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+    ) -> pd.DataFrame:
+        """Cached equivalent of `TableBuilderReader.read_table_to_long_format`"""
+        return self._get_or_parse(path, "read_table_to_long_format", as_index=as_index, drop_totals=drop_totals)
+
+    def read_header_metadata(self, path: Union[Path, str]) -> HeaderInfo:
+        """Header metadata of the file, taken from any current cache entry for it if possible."""
+        source, fingerprint = str(Path(path).resolve()), self._fingerprint(path)
+        for entry in self._entries():
+            meta = self._read_meta(entry)
+            if meta is not None and meta["source"] == source and meta["fingerprint"] == fingerprint:
+                return HeaderInfo(**meta["header"])
+        return TableBuilderReader.peek(path).header
+
+    def invalidate(self, path: Optional[Union[Path, str]] = None) -> int:
+        """Remove cache entries for `path` (for any reader arguments), or all entries if path is None.
+
+        Returns the number of entries removed.
+        """
+        source = None if path is None else str(Path(path).resolve())
+        removed = 0
+        for entry in self._entries():
+            meta = self._read_meta(entry)
+            if source is None or meta is None or meta["source"] == source:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def size_bytes(self) -> int:
+        """Total size on disk of the cache entries"""
+        return sum(_dir_size(entry) for entry in self._entries())
+
+    def _get_or_parse(
+        self, path: Union[Path, str], method: str, *, as_index: bool, drop_totals: Optional[str]
+    ) -> Table:
+        key_data = {
+            "source": str(Path(path).resolve()),
+            "fingerprint": self._fingerprint(path),
+            "method": method,
+            "as_index": as_index,
+            "drop_totals": drop_totals,
+            "format_version": CACHE_FORMAT_VERSION,
+            "package_version": __version__,
+        }
+        key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()[:32]
+        entry = self.directory / key
+
+        if (entry / self.META_FILE).exists():
+            try:
+                table = self._load(entry)
+            except (OSError, ValueError, KeyError):  # partially evicted or otherwise corrupt entry, re-parse
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                os.utime(entry / self.META_FILE)  # record the access for LRU eviction
+                return table
+
+        reader = TableBuilderReader.from_mmap(path)
+        table = getattr(reader, method)(as_index=as_index, drop_totals=drop_totals)
+        self._store(entry, dict(key_data, header=dataclasses.asdict(reader.read_header_metadata())), table)
+        self._evict(keep=entry)
+        return table
+
+    def _fingerprint(self, path: Union[Path, str]) -> str:
+        if self.fingerprint == "stat":
+            stat = os.stat(path)
+            return f"{stat.st_size}-{stat.st_mtime_ns}"
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(2**20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _store(self, entry: Path, meta: dict, table: Table):
+        # write to a temporary directory then rename, so concurrent readers never see a partial entry
+        tmp = self.directory / f".tmp-{entry.name}-{uuid.uuid4().hex}"
+        tmp.mkdir()
+        try:
+            if isinstance(table, dict):
+                meta["wafers"] = list(table.keys())
+                for n, df in enumerate(table.values()):
+                    df.to_parquet(tmp / f"wafer_{n:04d}.parquet")
+            else:
+                meta["wafers"] = None
+                table.to_parquet(tmp / "table.parquet")
+            (tmp / self.META_FILE).write_text(json.dumps(meta))
+            os.replace(tmp, entry)
+        except OSError:
+            if not entry.exists():
+                raise
+            # otherwise the entry was populated concurrently by another process, keep that one
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _load(self, entry: Path) -> Table:
+        meta = json.loads((entry / self.META_FILE).read_text())
+        if meta["wafers"] is None:
+            return pd.read_parquet(entry / "table.parquet")
+        return {title: pd.read_parquet(entry / f"wafer_{n:04d}.parquet") for n, title in enumerate(meta["wafers"])}
+
+    def _evict(self, keep: Path):
+        if self.max_bytes is None:
+            return
+        entries = []
+        for entry in self._entries():
+            try:
+                entries.append(((entry / self.META_FILE).stat().st_mtime, _dir_size(entry), entry))
+            except OSError:  # removed concurrently
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def _entries(self):
+        return [p for p in self.directory.iterdir() if p.is_dir() and not p.name.startswith(".")]
+
+    def _read_meta(self, entry: Path) -> Optional[dict]:
+        try:
+            return json.loads((entry / self.META_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir())
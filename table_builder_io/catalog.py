@@ -0,0 +1,377 @@
+"""Persistent catalog of the metadata of a corpus of TableBuilder files in a local SQLite database, so that files can be
+found by dataset, counting, variables or dimensions without opening every one of them."""
+
+import json
+import mmap
+import os
+import sqlite3
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Union
+
+from table_builder_io import buffer as buf
+from table_builder_io.parse_metadata import HeaderInfo
+from table_builder_io.reader import TableBuilderReader, _parse_span_headers
+
+# bump if the layout of the database changes, older catalogs are then rebuilt from scratch on the next update
+SCHEMA_VERSION = 1
+SCAN_CHUNKSIZE = 16  # files sent to each worker process at a time
+
+SearchTerms = Union[str, Sequence[str]]
+HEADER_FIELDS = ("dataset", "variables", "counting", "filters")  # header metadata fields which can be searched
+
+_FILE_COLUMNS = (
+    "path",
+    "size",
+    "mtime_ns",
+    "error",
+    "authority",
+    "dataset",
+    "variables",
+    "counting",
+    "filters",
+    "summation",
+    "header_start",
+    "header_end",
+    "body_start",
+    "body_end",
+    "footer_start",
+    "footer_end",
+    "num_cells",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    error TEXT,
+    authority TEXT,
+    dataset TEXT,
+    variables TEXT,
+    counting TEXT,
+    filters TEXT,
+    summation TEXT,
+    header_start INTEGER,
+    header_end INTEGER,
+    body_start INTEGER,
+    body_end INTEGER,
+    footer_start INTEGER,
+    footer_end INTEGER,
+    num_cells INTEGER
+);
+CREATE TABLE IF NOT EXISTS dimensions (
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    axis TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tables (
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    wafer TEXT,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    num_rows INTEGER NOT NULL,
+    num_columns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dimensions_path ON dimensions(path);
+CREATE INDEX IF NOT EXISTS tables_path ON tables(path);
+"""
+
+
+@dataclass
+class CatalogEntry:
+    """Metadata of a single file in a `Catalog`.
+
+    Args:
+        path: absolute path of the file
+        header: the parsed header metadata
+        row_dimensions: names of the row label levels (the row headers), outermost first
+        column_dimensions: names of the column label levels, outermost first
+        wafers: wafer titles in file order, empty if the file is a single table
+        num_cells: number of cells of values in the file, summed over wafers (including totals)
+        section_index: offsets of the header, body, footer and wafers, as in `TableBuilderReader.section_index` of
+            `TableBuilderReader.from_mmap`, so into the LF translated contents for files with Windows (CRLF) line
+            endings
+        size / mtime_ns: size and modification time of the file when it was catalogued
+    """
+
+    path: Path
+    header: HeaderInfo
+    row_dimensions: List[str]
+    column_dimensions: List[str]
+    wafers: List[str]
+    num_cells: int
+    section_index: buf.SectionIndex
+    size: int
+    mtime_ns: int
+
+    def open(self) -> TableBuilderReader:
+        """Memory mapped reader of the file, with its sections located from the catalog rather than by scanning.
+
+        If the file has changed since it was catalogued, the reader locates the sections itself as usual.
+        """
+        reader = TableBuilderReader.from_mmap(self.path)
+        stat = os.stat(self.path)
+        if (stat.st_size, stat.st_mtime_ns) == (self.size, self.mtime_ns):
+            reader._section_index = self.section_index
+        return reader
+
+
+class CatalogUpdate(NamedTuple):
+    """Paths changed by `Catalog.update`, failed maps the paths which couldn't be read to the error."""
+
+    added: List[str]
+    updated: List[str]
+    removed: List[str]
+    failed: Dict[str, str]
+
+
+class Catalog:
+    """Catalog of the metadata of TableBuilder files, stored in a SQLite database at `database`.
+
+    `update` scans a directory tree (in parallel), reading the header metadata, row and column dimensions, wafer
+    titles, cell counts and section offsets of each file. Only new or modified files (by size and modification time)
+    are read again. `find` then queries the catalog without touching the files:
+
+        with Catalog("~/.cache/extracts.sqlite") as catalog:
+            catalog.update("/data/extracts")
+            for entry in catalog.find(counting="Persons Place of Usual Residence", dimension=["SA2", "OCCP"]):
+                df = entry.open().read_table()
+    """
+
+    def __init__(self, database: Union[Path, str]):
+        self.database = Path(database).expanduser()
+        self._connection = sqlite3.connect(str(self.database))
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._create_schema()
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        self._connection.close()
+
+    def update(
+        self,
+        directory: Union[Path, str],
+        *,
+        pattern: str = "*.csv",
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> CatalogUpdate:
+        """Bring the catalog up to date with the files matching `pattern` anywhere under `directory`.
+
+        New and modified files are read, and entries of files under directory which no longer exist are removed.
+        Files which can't be read as TableBuilder files are recorded as failed, and only retried once modified.
+        pattern is a glob matched against file names, e.g. "*.csv.gz" for gzipped files.
+        workers / executor: as in `read_many`, the number of processes to read files with or an existing executor.
+        """
+        if workers is not None and executor is not None:
+            raise ValueError("Only one of 'workers' or 'executor' should be supplied")
+        directory = Path(directory).expanduser().resolve()
+        if not directory.is_dir():
+            raise ValueError(f"'{directory}' is not a directory")
+
+        rows = self._connection.execute("SELECT path, size, mtime_ns FROM files")
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+        found, changed = set(), []
+        for path in sorted(directory.rglob(pattern)):
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            found.add(str(path))
+            if known.get(str(path)) != (stat.st_size, stat.st_mtime_ns):
+                changed.append(str(path))
+
+        if len(changed) == 0:
+            records = []
+        elif executor is not None:
+            records = list(executor.map(_scan_file, changed, chunksize=SCAN_CHUNKSIZE))
+        elif workers == 1:
+            records = list(map(_scan_file, changed))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                records = list(pool.map(_scan_file, changed, chunksize=SCAN_CHUNKSIZE))
+
+        removed = [path for path in known if _is_relative_to(path, directory) and path not in found]
+        with self._connection:
+            self._connection.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in removed + changed])
+            for record in records:
+                self._insert(record)
+
+        return CatalogUpdate(
+            added=[r["path"] for r in records if r["path"] not in known],
+            updated=[r["path"] for r in records if r["path"] in known],
+            removed=removed,
+            failed={r["path"]: r["error"] for r in records if r["error"] is not None},
+        )
+
+    def find(
+        self,
+        *,
+        dataset: Optional[SearchTerms] = None,
+        variables: Optional[SearchTerms] = None,
+        counting: Optional[SearchTerms] = None,
+        filters: Optional[SearchTerms] = None,
+        dimension: Optional[SearchTerms] = None,
+        wafer: Optional[SearchTerms] = None,
+    ) -> List[CatalogEntry]:
+        """Entries of the catalogued files matching all of the given search terms, ordered by path.
+
+        Each argument is a (case insensitive) substring, or a list of substrings which must all match.
+        dataset, variables, counting and filters match the fields of the header metadata, dimension matches the name
+        of any row or column dimension, and wafer the title of any wafer.
+        """
+        clauses, params = ["error IS NULL"], []
+        for field, terms in zip(HEADER_FIELDS, (dataset, variables, counting, filters)):
+            for term in _as_terms(terms):
+                clauses.append(f"{field} LIKE ? ESCAPE '\\'")
+                params.append(_like_pattern(term))
+        for table, column, terms in (("dimensions", "name", dimension), ("tables", "wafer", wafer)):
+            for term in _as_terms(terms):
+                clauses.append(
+                    f"EXISTS (SELECT 1 FROM {table} t WHERE t.path = files.path AND t.{column} LIKE ? ESCAPE '\\')"
+                )
+                params.append(_like_pattern(term))
+
+        query = f"SELECT path FROM files WHERE {' AND '.join(clauses)} ORDER BY path"
+        return [self._entry(path) for (path,) in self._connection.execute(query, params).fetchall()]
+
+    def get(self, path: Union[Path, str]) -> CatalogEntry:
+        """Entry of a single catalogued file"""
+        path = str(Path(path).expanduser().resolve())
+        row = self._connection.execute("SELECT error FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            raise ValueError(f"'{path}' is not in the catalog")
+        if row[0] is not None:
+            raise ValueError(f"'{path}' couldn't be read when catalogued: {row[0]}")
+        return self._entry(path)
+
+    def paths(self) -> List[Path]:
+        """Paths of all the (readable) catalogued files"""
+        rows = self._connection.execute("SELECT path FROM files WHERE error IS NULL ORDER BY path")
+        return [Path(path) for (path,) in rows]
+
+    def _create_schema(self):
+        with self._connection:
+            (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+            if version != SCHEMA_VERSION:
+                for table in ("tables", "dimensions", "files"):
+                    self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _insert(self, record: dict):
+        self._connection.execute(
+            f"INSERT INTO files ({', '.join(_FILE_COLUMNS)}) VALUES ({', '.join(':' + c for c in _FILE_COLUMNS)})",
+            record,
+        )
+        self._connection.executemany(
+            "INSERT INTO dimensions VALUES (?, ?, ?, ?)",
+            [(record["path"], axis, level, name) for axis, level, name in record["dimensions"]],
+        )
+        self._connection.executemany(
+            "INSERT INTO tables VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(record["path"], position, *table) for position, table in enumerate(record["tables"])],
+        )
+
+    def _entry(self, path: str) -> CatalogEntry:
+        cursor = self._connection.execute("SELECT * FROM files WHERE path = ?", (path,))
+        row = dict(zip((column for column, *_ in cursor.description), cursor.fetchone()))
+        dimensions = self._connection.execute(
+            "SELECT axis, name FROM dimensions WHERE path = ? ORDER BY axis, level", (path,)
+        ).fetchall()
+        tables = self._connection.execute(
+            "SELECT wafer, start, end FROM tables WHERE path = ? ORDER BY position", (path,)
+        ).fetchall()
+        wafers = [(title, (start, end)) for title, start, end in tables if title is not None]
+        header = HeaderInfo(
+            row["authority"],
+            row["dataset"],
+            row["variables"],
+            row["counting"],
+            json.loads(row["filters"]),
+            row["summation"],
+        )
+        index = buf.SectionIndex(
+            (row["header_start"], row["header_end"]),
+            (row["body_start"], row["body_end"]),
+            (row["footer_start"], row["footer_end"]),
+            wafers,
+        )
+        return CatalogEntry(
+            path=Path(path),
+            header=header,
+            row_dimensions=[name for axis, name in dimensions if axis == "row"],
+            column_dimensions=[name for axis, name in dimensions if axis == "column"],
+            wafers=[title for title, _ in wafers],
+            num_cells=row["num_cells"],
+            section_index=index,
+            size=row["size"],
+            mtime_ns=row["mtime_ns"],
+        )
+
+
+def _scan_file(path: str) -> dict:
+    """Catalog record of a single file, module level so it can be used by a process pool."""
+    stat = os.stat(path)  # before reading, so a file modified while it is read is read again on the next update
+    record = dict.fromkeys(_FILE_COLUMNS)
+    record.update(path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns, dimensions=[], tables=[])
+    buffer = None
+    try:
+        reader = TableBuilderReader.from_mmap(path)
+        buffer = reader._get_buffer()
+        index = reader.section_index
+        header = reader.read_header_metadata()
+        tables = []
+        for title, (start, end) in index.wafers or [(None, index.body)]:
+            parsed, data_start, _, _ = _parse_span_headers(buffer, start, end, "c", None)
+            tables.append((title, start, end, buf.count_lines(buffer, data_start, end), parsed.num_col_index_cols))
+    except (ValueError, KeyError, OSError) as e:  # not a TableBuilder file, or malformed table headers
+        record["error"] = f"{type(e).__name__}: {e}"
+        return record
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+    record.update(
+        authority=header.authority,
+        dataset=header.dataset,
+        variables=header.variables,
+        counting=header.counting,
+        filters=json.dumps(header.filters),
+        summation=header.summation,
+        header_start=index.header[0],
+        header_end=index.header[1],
+        body_start=index.body[0],
+        body_end=index.body[1],
+        footer_start=index.footer[0],
+        footer_end=index.footer[1],
+        num_cells=sum(num_rows * num_columns for *_, num_rows, num_columns in tables),
+        tables=tables,
+        dimensions=[("row", level, name) for level, name in enumerate(parsed.row_headers)]
+        + [("column", level, name) for level, name in enumerate(parsed.col_dimension)],
+    )
+    return record
+
+
+def _is_relative_to(path: str, directory: Path) -> bool:
+    return path.startswith(str(directory) + os.sep)
+
+
+def _as_terms(terms: Optional[SearchTerms]) -> List[str]:
+    if terms is None:
+        return []
+    return [terms] if isinstance(terms, str) else list(terms)
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
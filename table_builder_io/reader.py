@@ -1,119 +1,527 @@
+import asyncio
+import csv
+import functools
+import gzip
+import mmap
 import re
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass
-from io import StringIO
+from itertools import accumulate, chain, islice, repeat
+from io import BytesIO, StringIO
 from pathlib import Path
-from typing import Tuple, List, IO, Dict, Union, Pattern, Optional
+from typing import (
+    Tuple,
+    List,
+    IO,
+    Dict,
+    Union,
+    Pattern,
+    Optional,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Callable,
+    AsyncIterable,
+    AsyncIterator,
+    TYPE_CHECKING,
+)
 from warnings import warn
 
+import numpy as np
 import pandas as pd
 from typing_extensions import Self, Literal
 
+from table_builder_io import buffer as buf
+from table_builder_io import stats as _stats
 from table_builder_io.parse_metadata import HeaderInfo
 from table_builder_io.regexes import (
     ABS_HEADER_METADATA_PATTERN,
     ABS_FOOTER_METADATA_PATTERN,
+    ABS_FOOTER_DATA_SOURCE_PATTERN,
     RE_QUOTE_WRAPPED_CSV_SPLITTER,
     RE_QUOTE_WRAPPED_CSV_SPLITTER_AND_CS,
-    WAFER_ROW,
 )
 
+if TYPE_CHECKING:  # optional dependencies, only imported when used
+    import pyarrow
+    import scipy.sparse
+
+
+Engine = Literal["c", "numpy", "pyarrow"]
+ENGINES = ("c", "numpy", "pyarrow")
+SparseOption = Union[bool, Literal["scipy"]]
+ColumnLabel = Union[str, Tuple[str, ...]]
+RowLabels = Union[str, Tuple[str, ...]]
+RowSelection = Union[List[RowLabels], Callable[[RowLabels], bool]]
+Layout = Literal["wide", "long"]
+LAYOUTS = ("wide", "long")
+# a path, an object with an async read(n) method (e.g. asyncio.StreamReader) or an async iterable of bytes chunks
+AsyncSource = Union[Path, str, asyncio.StreamReader, AsyncIterable[bytes]]
+ARCHIVE_SUFFIXES = (".gz", ".zip")  # suffixes of files which from_file / from_mmap read via from_archive
+NUMPY_ENGINE_BLOCK_ROWS = 4096  # rows of cells parsed per call to numpy by engine="numpy"
+# largest fraction of the columns selected for which engine="numpy" only parses the selected cells, rather than all
+SELECTED_CELLS_FRACTION = 0.25
+RUN_SAMPLE_SIZE = 4096  # labels sampled to judge whether a level of labels is in runs, see _factorize_runs
+SIGNED_INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)  # candidate dtypes of compact=True values, narrowest first
+
+
+def _recording_stats(method):
+    """Record the stages of `method` in the reader's stats, if it has any."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.stats is None:
+            return method(self, *args, **kwargs)
+        with self.stats:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class TableBuilderReader:
-    """Manages reading and parsing raw CSV data from table builder."""
+    """Manages reading and parsing raw CSV data from table builder.
+
+    Assign a `table_builder_io.ReadStats` to `stats` to record the time spent in each stage of reading.
+    """
 
     HEADER_FOOTER_MAX_EXTENT = 20  # maximum candidate size of header / footer, used to limit the search space
     HEADER_PATTERN = re.compile(ABS_HEADER_METADATA_PATTERN)
     FOOTER_PATTERN = re.compile(ABS_FOOTER_METADATA_PATTERN)
 
-    def __init__(self, line_list: List[str]):
-        self.lines = line_list
+    def __init__(self, line_list: Optional[List[str]] = None, *, buffer: Optional[Union[str, bytes, mmap.mmap]] = None):
+        if (line_list is None) == (buffer is None):
+            raise ValueError("Exactly one of 'line_list' or 'buffer' must be supplied")
+        self._lines = line_list
+        # The file contents as a single buffer, sections are located as offsets into it. Either text, or bytes
+        # (e.g. a memory map) which are only decoded piecewise as needed. Joined from line_list on first use.
+        self._buffer = buffer
 
         # private methods to store partitioned data, dealing with less than optimal api choices.
         # This is due to these being retrieved as a group of three, but only consumed individually
         self._raw_header: Optional[str] = None
         self._raw_body: Optional[str] = None
         self._raw_footer: Optional[str] = None
+        self._section_index: Optional[buf.SectionIndex] = None
+        # path the reader was created from, if any
+        self._path: Optional[Path] = None
+        self.stats: Optional[_stats.ReadStats] = None
 
     @classmethod
     def from_file(cls, path: Union[Path, str]) -> Self:
-        """Create a TableBuilderReader from file"""
-        with open(path, "r") as f:
-            contents = f.readlines()
-        return cls(contents)
+        """Create a TableBuilderReader from file, reading gzip (`.gz`) and zip (`.zip`) files via `from_archive`"""
+        if _is_archive(path):
+            return cls._from_single_archive(path)
+        with _stats.stage("read_file"), open(path, "r") as f:
+            contents = f.read()
+        reader = cls(buffer=contents)
+        reader._path = Path(path)
+        return reader
+
+    @classmethod
+    def from_mmap(cls, path: Union[Path, str]) -> Self:
+        """Create a TableBuilderReader backed by a read only memory map of the file.
+
+        The header, footer and wafers are located as byte offsets into the map, and the table body is streamed to
+        `pd.read_csv` from a bounded view, so the file contents are never copied into python strings or line lists.
+        With `read_table(engine="numpy")` this makes peak memory use close to the size of the resulting DataFrame(s).
+        The c (default) and pyarrow engines still build their own copies of the parsed cells, so peak memory is a few
+        times the size of the result with these.
+        Compressed files can't be mapped, so gzip (`.gz`) and zip (`.zip`) files are decompressed via `from_archive`.
+        Files with Windows (CRLF) line endings can't be parsed in place either, so are read a chunk at a time with the
+        line endings translated to LF, as for compressed files. Offsets into these are offsets into the LF contents.
+        """
+        if _is_archive(path):
+            return cls._from_single_archive(path)
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # the map stays valid after f is closed
+            if _has_crlf_line_endings(buffer):
+                buffer.close()
+                return cls._from_stream(f, 2**20, Path(path))
+        reader = cls(buffer=buffer)
+        reader._path = Path(path)
+        return reader
+
+    @classmethod
+    def from_archive(
+        cls, path: Union[Path, str], member: Optional[str] = None, *, chunk_size: int = 2**20
+    ) -> Union[Self, Dict[str, Self]]:
+        """Create a TableBuilderReader from a gzip compressed file or a zip archive (e.g. a TableBuilder download).
+
+        The file is decompressed a chunk at a time straight into the reader's buffer, locating candidate wafer titles
+        as the chunks arrive (as in `aread`), so nothing is extracted to disk and the contents are never held as text.
+        member is the name of the CSV file to read from a zip archive. If None, every CSV file in the archive is read,
+            returning a dict mapping member name to reader if there is more than one.
+        """
+        path = Path(path)
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                if member is None:
+                    names = [info.filename for info in archive.infolist() if _is_csv_member(info)]
+                    if len(names) == 0:
+                        raise ValueError(f"No CSV files found in zip archive '{path}'")
+                elif member in archive.namelist():
+                    names = [member]
+                else:
+                    raise ValueError(f"No member {member!r} in zip archive '{path}', found {archive.namelist()}")
+                readers = {}
+                for name in names:
+                    with archive.open(name) as f:
+                        readers[name] = cls._from_stream(f, chunk_size, path)
+            return readers[names[0]] if len(readers) == 1 else readers
+
+        if member is not None:
+            raise ValueError(f"'{path}' is not a zip archive, member can only be used with zip archives")
+        with open(path, "rb") as f:
+            is_gzip = f.read(2) == b"\x1f\x8b"
+        if not is_gzip:
+            raise ValueError(f"'{path}' is neither a gzip file nor a zip archive")
+        with gzip.open(path, "rb") as f:
+            return cls._from_stream(f, chunk_size, path)
+
+    @classmethod
+    def _from_single_archive(cls, path: Union[Path, str]) -> Self:
+        reader = cls.from_archive(path)
+        if isinstance(reader, dict):
+            raise ValueError(
+                f"'{path}' contains several CSV files {list(reader)}, use from_archive to read them all (or one with "
+                "member=...)"
+            )
+        return reader
+
+    @classmethod
+    def _from_stream(cls, f: IO[bytes], chunk_size: int, path: Path) -> Self:
+        contents = bytearray()
+        scanner = buf.WaferScanner()
+        with _stats.stage("read_file"):
+            for chunk in _lf_line_endings(iter(functools.partial(f.read, chunk_size), b"")):
+                contents += chunk
+                scanner.feed(contents)
+        reader = cls(buffer=contents)
+        reader._path = path
+        reader._index_sections(wafer_candidates=scanner.candidates)
+        return reader
+
+    @classmethod
+    async def aread(cls, source: AsyncSource, *, chunk_size: int = 2**20) -> Self:
+        """Create a TableBuilderReader from a file or async stream of bytes, without blocking the event loop.
+
+        source is a path (read a chunk at a time in the event loop's default executor), an object with an async
+        `read(n)` method (e.g. `asyncio.StreamReader`, or the content of an http response) or an async iterable of
+        bytes chunks. Candidate wafer titles are located as the chunks arrive, so the file doesn't need to be scanned
+        again once read. Windows (CRLF) line endings are translated to LF as they arrive, as in `from_archive`.
+        Use `aread_table` to parse the table off the event loop:
+
+            reader = await TableBuilderReader.aread(response.content)
+            df = await reader.aread_table(executor=pool, as_index=True)
+        """
+        loop = asyncio.get_event_loop()
+        contents = bytearray()
+        scanner = buf.WaferScanner()
+        with _stats.stage("read_file"):
+            async for chunk in _alf_line_endings(_aiter_chunks(source, chunk_size, loop)):
+                contents += chunk
+                scanner.feed(contents)
+        reader = cls(buffer=contents)
+        if isinstance(source, (str, Path)):
+            reader._path = Path(source)
+        reader._index_sections(wafer_candidates=scanner.candidates)
+        return reader
+
+    async def aread_table(self, *, executor: Optional[Executor] = None, **kwargs):
+        """`read_table` run in `executor` (the event loop's default executor if None), so the event loop is free to
+        serve other ingests while the table is parsed. kwargs are as in `read_table`.
+
+        Parsing is mostly CPU bound, so a `ProcessPoolExecutor` gives the most concurrency, at the cost of sending
+        the file contents to the worker process.
+        """
+        loop = asyncio.get_event_loop()
+        if isinstance(executor, ProcessPoolExecutor):
+            buffer = self._get_buffer()
+            source = self._path if isinstance(buffer, mmap.mmap) else buffer  # maps are mapped again by the worker
+            task = functools.partial(_read_table_in_process, type(self), source, self.section_index, kwargs)
+        else:
+            task = functools.partial(self.read_table, **kwargs)
+        return await loop.run_in_executor(executor, task)
+
+    @classmethod
+    def peek(cls, path: Union[Path, str]) -> "PeekInfo":
+        """Read the metadata of a TableBuilder file from the ends of the file only, without touching the table body.
+
+        The first and last `HEADER_FOOTER_MAX_EXTENT` lines are read with seeks, so this costs the same for any size
+        of file, e.g. for cataloguing many extracts by dataset, variables and counting. Compressed files can't be
+        read from the end, so gzip (`.gz`) and zip (`.zip`) files are decompressed in full via `from_archive`.
+        """
+        if _is_archive(path):
+            reader = cls._from_single_archive(path)
+            buffer, index = reader._get_buffer(), reader.section_index
+            raw_footer = buf.decode_span(buffer, *index.footer)
+            return PeekInfo.from_footer(reader.read_header_metadata(), raw_footer, index.body)
+
+        max_extent = cls.HEADER_FOOTER_MAX_EXTENT
+        with _stats.stage("peek"), open(path, "rb") as f:
+            # the ends are matched with any Windows (CRLF) line endings translated, the body offsets are then mapped
+            # back to offsets into the file
+            raw_head = buf.read_head(f, max_extent)
+            head = buf.crlf_to_lf(raw_head)
+            header_span, body_start = buf.locate_header(head, max_extent, cls.HEADER_PATTERN)
+            body_start = buf.raw_offset(raw_head, body_start)
+            tail_start, raw_tail = buf.read_tail(f, max_extent)
+            tail = buf.crlf_to_lf(raw_tail)
+        # in small files the head and tail overlap, the footer is searched for after the header as in index_sections
+        tail_body_start = buf.lf_offset(raw_tail, max(0, body_start - tail_start))
+        footer_span, body_end = buf.locate_footer(tail, max_extent, cls.FOOTER_PATTERN, tail_body_start)
+        body_end = buf.strip_newlines(tail, tail_body_start, body_end)[1]
+        body_end = tail_start + buf.raw_offset(raw_tail, body_end)
+        head_body_start = buf.lf_offset(raw_head, body_start)
+        head_body_end = buf.lf_offset(raw_head, min(len(raw_head), body_end))
+        body_start = buf.raw_offset(raw_head, buf.strip_newlines(head, head_body_start, head_body_end)[0])
+        return PeekInfo.from_footer(
+            HeaderInfo.from_raw_text(buf.decode_span(head, *header_span)),
+            buf.decode_span(tail, *footer_span),
+            (body_start, body_end),
+        )
 
     @classmethod
     def from_file_handler(cls, fh: IO[str]) -> Self:
         """Create a TableBuilderReader from an open file handler ( e.g. from f in `with open(fpath, 'r') as f:`)"""
-        return cls(fh.readlines())
+        return cls(buffer=fh.read())
 
     @classmethod
     def from_string(cls, string: str) -> Self:
         """Create a TableBuilderReader from a string containing a TableBuilder CSV as its contents"""
         # expect everything to end with a newline, consistent with readlines
-        # Note this is marginally quicker than io.StringIO(string).readlines()
-        return cls([i + "\n" for i in string.strip("\n").splitlines()])
+        return cls(buffer="\n".join(string.strip("\n").splitlines()) + "\n")
+
+    @property
+    def lines(self) -> List[str]:
+        """The lines of the file (newline terminated), as would be returned by readlines."""
+        if self._lines is None:
+            return StringIO(buf.decode_span(self._buffer, 0, len(self._buffer))).readlines()
+        return self._lines
+
+    @property
+    def section_index(self) -> buf.SectionIndex:
+        """Offsets of the header, body, footer and wafers of the file, located in a single pass on first use.
+
+        All reading of the file is done from these offsets, so the sections are never split out into copies.
+        """
+        if self._section_index is None:
+            self._index_sections()
+        return self._section_index
+
+    @_recording_stats
+    def _index_sections(self, wafer_candidates: Optional[List[int]] = None):
+        buffer = self._get_buffer()
+        with _stats.stage("index_sections"):
+            self._section_index = buf.index_sections(
+                buffer, self.HEADER_FOOTER_MAX_EXTENT, self.HEADER_PATTERN, self.FOOTER_PATTERN, wafer_candidates
+            )
+        stats = _stats.active()
+        if stats is not None:
+            stats.input_size = len(buffer)
+            stats.num_wafers = len(self._section_index.wafers)
 
     @property
     def raw_header(self) -> str:
         """Retrieve the raw metadata header. Deliberately read only."""
         if self._raw_header is None:
-            self._raw_header, self._raw_body, self._raw_footer = self.split_metadata()
+            self._raw_header = buf.decode_span(self._get_buffer(), *self.section_index.header)
         return self._raw_header
 
     @property
     def raw_body(self) -> str:
         """Retrieve the plaintext "body" of the tablebuilder "document" i.e. the table part. Deliberately read only."""
-        if self._raw_header is None:
-            self._raw_header, self._raw_body, self._raw_footer = self.split_metadata()
+        if self._raw_body is None:
+            self._raw_body = buf.decode_span(self._get_buffer(), *self.section_index.body)
         return self._raw_body
 
     @property
     def raw_footer(self) -> str:
         """Retrieve the raw metadata footer. Deliberately read only."""
-        if self._raw_header is None:
-            self._raw_header, self._raw_body, self._raw_footer = self.split_metadata()
+        if self._raw_footer is None:
+            self._raw_footer = buf.decode_span(self._get_buffer(), *self.section_index.footer)
         return self._raw_footer
 
+    @_recording_stats
     def read_table(
-        self, *, as_index=True, drop_totals: Optional[Literal["rows", "columns", "both"]] = None
-    ) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        self,
+        *,
+        as_index=True,
+        drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        engine: Engine = "c",
+        compact: bool = False,
+        sparse: SparseOption = False,
+        lazy: bool = False,
+        columns: Optional[List[ColumnLabel]] = None,
+        rows: Optional[RowSelection] = None,
+        chunksize: Optional[int] = None,
+    ) -> Union[pd.DataFrame, Dict[str, pd.DataFrame], "LazyWafers", Iterator[pd.DataFrame]]:
         """Read the Table builder file to a DataFrame.
 
         as_index=True will return a result dataframe where the row and column labels are set as (multi)indexes.
             This mimics the actual layout in the CSV.
         as_index=False will return the data as a flat single level column index, which may be more convenient
             depending on how it is being used.
+        workers / executor parse the wafers of a file with wafers in parallel. Either give the number of worker
+            processes to use in a new `ProcessPoolExecutor`, or an existing `concurrent.futures.Executor`.
+            Only the wafer boundaries are located in this process; the result is identical to the serial read.
+            Readers created with `from_mmap` pass workers byte offsets into the file rather than the wafer text.
+        engine="c" parses the table with the pandas c engine csv reader.
+        engine="numpy" uses a specialised parser which reads the cells of each row directly into a preallocated int64
+            array, skipping csv type inference. This is faster on large, wide tables, but requires every cell to be
+            an integer (true of the default counts produced by TableBuilder).
+        engine="pyarrow" parses the table with the multithreaded `pyarrow.csv` reader (requires pyarrow), with the
+            column names and types given explicitly, so it also requires integer cells. The result is the same as
+            engine="c", and is usually several times faster to produce for large tables.
+        compact=True reduces the memory footprint of the result without changing its values: counts are stored in
+            the narrowest signed integer dtype that holds them, and row and column labels are stored as
+            categoricals (`CategoricalIndex` / categorical `MultiIndex` levels, or category columns).
+        sparse=True returns a frame with `SparseDtype` value columns, for tables which are mostly zeros (e.g. origin-
+            destination tables). Only the non zero cells are kept as the body is parsed (with the engine="numpy"
+            parser), so the dense table is never materialised.
+        sparse="scipy" instead returns a `SparseTable` of a `scipy.sparse.csr_matrix` and its row and column labels.
+            Requires as_index=True. Both sparse options require scipy.
+        lazy=True returns a `LazyWafers` mapping for files with wafers, which parses each wafer on first access
+            rather than all of them up front. Files without wafers are read as usual.
+        columns selects columns by label while parsing. Each line is still split into all of its cells, but only the
+            selected cells have to be integers: engine="numpy" only converts those when at most a quarter of the
+            columns are selected, and otherwise converts every cell of a block (or only the selected cells of blocks
+            where that fails). A label selects the columns with that (outermost level) label, or a tuple of labels
+            selects a single column of multilevel columns. Columns keep their order in the file. Raises KeyError if a label isn't found.
+        rows selects rows while parsing, dropping other lines before their values are parsed. Either a list of
+            labels (matching the outermost level of the row labels, or a tuple of all levels), or a callable which
+            is given the (forward filled) labels of each row as strings, a tuple of them for multilevel rows, and
+            returns whether to keep it. Only picklable callables can be used with workers.
+        chunksize returns an iterator of tables of (up to) chunksize lines of the body at a time, or for files with
+            wafers a dict of such iterators, so memory use is bounded by the chunk size rather than the table size
+            (when combined with `from_mmap`). Row labels are forward filled across chunks and every chunk has the
+            full column labels. The row labels of the whole table are scanned first, so every chunk has the row
+            label dtypes (and integer row index) of the table read without chunksize. Compact categoricals only have
+            the labels present in each chunk.
 
         """
-        body = self.raw_body
-        # First split is between text before wafer (which is empty, because any text before that's non-empty
-        # constitutes the header). So drop the first split
-        wafer_title_body_list = WAFER_ROW.split(body)[1:]
-
-        if len(wafer_title_body_list) == 0:  # No wafers, single body
-            out = _parse_main_table(body).get_df(as_index=as_index, drop_totals=drop_totals)
-        elif (len(wafer_title_body_list) % 2) != 0:  # Should have same number of wafer headers as bodies
-            raise ValueError("Malformatted or failure, more wafer titles than bodies")
+        _check_sparse_option(sparse, as_index)
+        parse_kwargs = dict(engine=engine, sparse=bool(sparse), columns=columns, rows=rows, label_codes=compact)
+        format_kwargs = dict(as_index=as_index, drop_totals=drop_totals, compact=compact, sparse=sparse)
+        if chunksize is not None:
+            if chunksize < 1:
+                raise ValueError(f"chunksize must be a positive number of lines, got {chunksize!r}")
+            if lazy or workers is not None or executor is not None:
+                raise ValueError("chunksize can't be combined with 'lazy', 'workers' or 'executor'")
+            index = self.section_index
+            if len(index.wafers) == 0:
+                return self._iter_span_chunks(index.body, chunksize, parse_kwargs, format_kwargs)
+            return {
+                title: self._iter_span_chunks(span, chunksize, parse_kwargs, format_kwargs)
+                for title, span in index.wafers
+            }
+        if lazy:
+            if workers is not None or executor is not None:
+                raise ValueError("lazy=True parses wafers on access, it can't be combined with 'workers' or 'executor'")
+            if len(self.section_index.wafers) > 0:
+                return LazyWafers(self, parse_kwargs, format_kwargs)
+        if workers is not None or executor is not None:
+            if workers is not None and executor is not None:
+                raise ValueError("Only one of 'workers' or 'executor' should be supplied")
+            if executor is not None:
+                return self._read_table_concurrently(executor, parse_kwargs, format_kwargs)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return self._read_table_concurrently(pool, parse_kwargs, format_kwargs)
+
+        index = self.section_index
+        if len(index.wafers) == 0:  # No wafers, single body
+            return self._read_span(index.body, parse_kwargs, format_kwargs)
+        return {title: self._read_span(span, parse_kwargs, format_kwargs) for title, span in index.wafers}
+
+    def _read_table_concurrently(
+        self, executor: Executor, parse_kwargs: dict, format_kwargs: dict
+    ) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        index = self.section_index
+        if len(index.wafers) == 0:  # No wafers, nothing to parallelise
+            return self._read_span(index.body, parse_kwargs, format_kwargs)
+
+        buffer = self._get_buffer()
+        if isinstance(buffer, mmap.mmap) and self._path is not None:
+            # avoid sending the text to workers when they are able to map the file themselves
+            tasks = [_FileSpan(self._path, *span) for _, span in index.wafers]
         else:
-            # first of triplet is the (empty) pattern before the start of the wafer text
-            titles = wafer_title_body_list[::2]
-            bodies = wafer_title_body_list[1::2]
-
-            out = {}
-            for title, wafer_body in zip(titles, bodies):
-                df = _parse_main_table(wafer_body.strip("\n")).get_df(as_index=as_index, drop_totals=drop_totals)
-                out[title] = df
-
-        return out
+            tasks = [buf.decode_span(buffer, *span) for _, span in index.wafers]
+        dfs = executor.map(_read_wafer, tasks, repeat(parse_kwargs), repeat(format_kwargs))
+        return dict(zip((title for title, _ in index.wafers), dfs))
 
+    def iter_wafers(
+        self,
+        *,
+        as_index=True,
+        drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+        engine: Engine = "c",
+        compact: bool = False,
+        sparse: SparseOption = False,
+        columns: Optional[List[ColumnLabel]] = None,
+        rows: Optional[RowSelection] = None,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Lazily read the wafers of the Table builder file, yielding (wafer title, DataFrame) pairs in file order.
+
+        Unlike `read_table`, each wafer is only parsed when the generator is advanced, so at most one wafer's text
+        and DataFrame are held at once (as long as the caller doesn't keep them). This pairs best with
+        `from_mmap`, which doesn't hold the file contents in memory either.
+        Raises ValueError if the file has no wafers.
+
+        as_index, drop_totals, engine, compact, sparse, columns and rows behave as in `read_table`.
+        """
+        _check_sparse_option(sparse, as_index)
+        parse_kwargs = dict(engine=engine, sparse=bool(sparse), columns=columns, rows=rows, label_codes=compact)
+        format_kwargs = dict(as_index=as_index, drop_totals=drop_totals, compact=compact, sparse=sparse)
+        wafers = self.section_index.wafers
+        if len(wafers) == 0:
+            raise ValueError("No wafers found in file, use read_table instead")
+        for title, span in wafers:
+            yield title, self._read_span(span, parse_kwargs, format_kwargs)
+
+    @_recording_stats
+    def _read_span(self, span: buf.Span, parse_kwargs: dict, format_kwargs: dict):
+        # stats are recorded per wafer rather than around iter_wafers, so they aren't active while it is suspended
+        return _format_table(self._parse_span(*span, **parse_kwargs), **format_kwargs)
+
+    def _iter_span_chunks(
+        self, span: buf.Span, chunksize: int, parse_kwargs: dict, format_kwargs: dict
+    ) -> Iterator[Union[pd.DataFrame, "SparseTable"]]:
+        chunks = _iter_main_table_chunks(self._get_buffer(), *span, chunksize, **parse_kwargs)
+        while True:
+            table = self._next_chunk(chunks, format_kwargs)
+            if table is None:
+                return
+            yield table
+
+    @_recording_stats
+    def _next_chunk(self, chunks: Iterator["TableBuilderResult"], format_kwargs: dict):
+        # like _read_span, stats are recorded per chunk so they aren't active while the iterator is suspended
+        table = next(chunks, None)
+        return None if table is None else _format_table(table, **format_kwargs)
+
+    def _parse_span(self, start: int, end: int, **parse_kwargs) -> "TableBuilderResult":
+        return _parse_main_table_span(self._get_buffer(), start, end, **parse_kwargs)
+
+    def _get_buffer(self) -> Union[str, bytes, mmap.mmap]:
+        if self._buffer is None:
+            self._buffer = "".join(self._lines)
+        return self._buffer
+
+    @_recording_stats
     def read_table_to_long_format(
         self, *, as_index=True, drop_totals: Optional[Literal["rows", "columns", "both"]] = None
     ):
         result = self.read_table(as_index=True, drop_totals=drop_totals)
         if isinstance(result, pd.DataFrame):
-            return result.stack().to_frame("value")
+            return _stack_columns(result).to_frame("value")
         elif isinstance(result, dict):
-            result_long = pd.concat((df.stack().to_frame(wafer_name) for (wafer_name, df) in result.items()), axis=1)
+            result_long = pd.concat(
+                (_stack_columns(df).to_frame(wafer_name) for (wafer_name, df) in result.items()), axis=1
+            )
             if not as_index:
                 result_long = result_long.reset_index()
             return result_long
@@ -121,6 +529,140 @@ class TableBuilderReader:
         else:
             raise ValueError("Unexpected type")
 
+    @_recording_stats
+    def read_table_to_long_records(
+        self,
+        *,
+        drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+        skip_zeros: bool = False,
+        compact: bool = False,
+    ) -> pd.DataFrame:
+        """Read the Table builder file to a long format frame, with one record per cell of the table.
+
+        The columns are the row labels, the column labels, "wafer" (files with wafers only) and "value". Unlike
+        `read_table_to_long_format`, the records are produced directly from the parsed body (with the engine="numpy"
+        parser), without building wide frames to stack and align. This is faster and has a lower peak memory use,
+        as the cells are parsed straight into the values of the records and the labels are expanded to the records
+        as small integer codes. Files with wafers still hold the records of every wafer while they are concatenated.
+        Label columns are categoricals (the equivalent of the levels of a stacked MultiIndex), since each label is
+        repeated across many records.
+
+        skip_zeros=True omits the (often very many) cells with a value of zero.
+        drop_totals behaves as in `read_table`. compact=True stores the values in the narrowest signed integer dtype
+            that holds them.
+        """
+        buffer, index = self._get_buffer(), self.section_index
+        if len(index.wafers) == 0:
+            return _read_long_records_span(
+                buffer, *index.body, drop_totals=drop_totals, skip_zeros=skip_zeros, compact=compact
+            )
+        records = [
+            _read_long_records_span(buffer, *span, drop_totals=drop_totals, skip_zeros=skip_zeros, compact=compact)
+            for _, span in index.wafers
+        ]
+        titles = [title for title, _ in index.wafers]
+        wafer = pd.Categorical.from_codes(np.repeat(np.arange(len(titles)), [len(r) for r in records]), titles)
+        result = _concat_records(records, compact=compact)
+        result.insert(len(result.columns) - 1, "wafer", wafer)
+        return result
+
+    @_recording_stats
+    def to_arrow(
+        self,
+        *,
+        layout: Layout = "wide",
+        drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+        engine: Engine = "c",
+        skip_zeros: bool = False,
+    ) -> "pyarrow.Table":
+        """Read the Table builder file to a `pyarrow.Table`, built from the parsed columns without going through
+        `get_df` (requires pyarrow).
+
+        layout="wide" has a string column for each level of the row labels, then a column of values for each column
+            of the table, named by its labels (joined with "_" for multilevel columns, as for as_index=False).
+        layout="long" has the columns of `read_table_to_long_records`, with dictionary encoded labels.
+        Files with wafers have a (dictionary encoded) "wafer" column before the values, and each wafer is a separate
+            chunk of the table's columns.
+        drop_totals behaves as in `read_table`, engine as in `read_table` for layout="wide", and skip_zeros as in
+            `read_table_to_long_records` for layout="long".
+        """
+        import pyarrow as pa
+
+        return pa.concat_tables(self._iter_arrow_tables(layout, drop_totals, engine, skip_zeros))
+
+    @_recording_stats
+    def to_parquet(
+        self,
+        path: Union[Path, str],
+        *,
+        layout: Layout = "wide",
+        partition_by_wafer: bool = True,
+        drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+        engine: Engine = "c",
+        skip_zeros: bool = False,
+    ):
+        """Write the Table builder file to parquet, one wafer at a time (requires pyarrow).
+
+        Only one wafer is held in memory at once, and it is converted to arrow from the parsed columns without going
+        through pandas. The columns are as in `to_arrow`.
+
+        partition_by_wafer=True writes files with wafers as a dataset directory at `path`, hive partitioned by wafer
+            (i.e. `path/wafer=<title>/...`), which `pyarrow.parquet.read_table(path)` or `pd.read_parquet(path)` read
+            back with the wafer column. Otherwise (and for files without wafers) a single file is written, with
+            each wafer in its own row group(s).
+        layout, drop_totals, engine and skip_zeros behave as in `to_arrow`.
+        """
+        import pyarrow.parquet as pq
+
+        tables = self._iter_arrow_tables(layout, drop_totals, engine, skip_zeros)
+        if partition_by_wafer and len(self.section_index.wafers) > 0:
+            import pyarrow.dataset as ds
+
+            first = next(tables)
+            batches = chain.from_iterable(table.to_batches() for table in chain([first], tables))
+            ds.write_dataset(
+                batches,
+                path,
+                schema=first.schema,
+                format="parquet",
+                partitioning=["wafer"],
+                partitioning_flavor="hive",
+                existing_data_behavior="delete_matching",
+            )
+            return
+
+        writer = None
+        try:
+            for table in tables:
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _iter_arrow_tables(
+        self,
+        layout: Layout,
+        drop_totals: Optional[Literal["rows", "columns", "both"]],
+        engine: Engine,
+        skip_zeros: bool,
+    ) -> Iterator["pyarrow.Table"]:
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
+        buffer, index = self._get_buffer(), self.section_index
+        for title, span in index.wafers or [(None, index.body)]:
+            if layout == "wide":
+                table = _parse_main_table_span(buffer, *span, engine=engine)
+                with _stats.stage("to_arrow"):
+                    yield _wide_arrow_table(table, drop_totals, wafer=title)
+            else:
+                records = _read_long_records_span(
+                    buffer, *span, drop_totals=drop_totals, skip_zeros=skip_zeros, compact=False
+                )
+                with _stats.stage("to_arrow"):
+                    yield _long_arrow_table(records, wafer=title)
+
     @staticmethod
     def drop_totals(df: pd.DataFrame, which: Literal["rows", "columns", "both"]) -> pd.DataFrame:
         """Convenience method to drop total rows/ columns from dataframe if they are unused in analysis.
@@ -158,12 +700,7 @@ class TableBuilderReader:
         return self.read_table(as_index=as_index)
 
     def split_metadata(self) -> Tuple[str, str, str]:
-        header, body_start_idx = self._extract_header()
-        footer, body_end_idx = self._extract_footer()
-
-        body = "".join(self.lines)[body_start_idx:body_end_idx].strip("\n")
-
-        return header, body, footer
+        return self.raw_header, self.raw_body, self.raw_footer
 
     def _extract_header(self) -> Tuple[str, int]:
         return _extract_header(self.lines, self.HEADER_FOOTER_MAX_EXTENT, self.HEADER_PATTERN)
@@ -172,6 +709,210 @@ class TableBuilderReader:
         return _extract_footer(self.lines, self.HEADER_FOOTER_MAX_EXTENT, self.FOOTER_PATTERN)
 
 
+def _stack_columns(df: pd.DataFrame) -> pd.Series:
+    # stack every level of (multilevel) columns, so the result is always a Series
+    return df.stack(list(range(df.columns.nlevels)))
+
+
+class LazyWafers(Mapping):
+    """Read only mapping of wafer title to table, returned by `read_table(lazy=True)`.
+
+    The titles come from the (cheap) scan for wafer boundaries, each wafer is only parsed the first time it is
+    accessed, then memoised. The mapping keeps a reference to its reader (and so to the file contents).
+    """
+
+    def __init__(self, reader: TableBuilderReader, parse_kwargs: dict, format_kwargs: dict):
+        self._reader = reader
+        self._parse_kwargs = parse_kwargs
+        self._format_kwargs = format_kwargs
+        # like dict(iter_wafers()), if titles are repeated the last wafer wins
+        self._spans: Dict[str, buf.Span] = dict(reader.section_index.wafers)
+        self._tables: Dict[str, Union[pd.DataFrame, "SparseTable"]] = {}
+
+    def __getitem__(self, title: str) -> Union[pd.DataFrame, "SparseTable"]:
+        if title not in self._tables:
+            self._tables[title] = self._reader._read_span(self._spans[title], self._parse_kwargs, self._format_kwargs)
+        return self._tables[title]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __contains__(self, title) -> bool:
+        return title in self._spans
+
+    def is_parsed(self, title: str) -> bool:
+        """Whether the wafer has been parsed yet"""
+        return title in self._tables
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self._spans)}, parsed={list(self._tables)})"
+
+
+@dataclass
+class PeekInfo:
+    """Metadata of a TableBuilder file read by `TableBuilderReader.peek`, without reading the table body.
+
+    Args:
+        header: the parsed header metadata
+        data_source: the data source named in the footer, e.g. "Census of Population and Housing"
+            (None if the footer doesn't name one in the usual form)
+        year: the census year named in the footer (None as for data_source)
+        body: (start, end) byte offsets of the table body (including any wafers) in the file, as in
+            `TableBuilderReader.section_index`. Offsets into the decompressed contents for gzip and zip files.
+            Offsets into the file itself for files with Windows (CRLF) line endings, unlike `section_index`.
+    """
+
+    header: HeaderInfo
+    data_source: Optional[str]
+    year: Optional[int]
+    body: buf.Span
+
+    @classmethod
+    def from_footer(cls, header: HeaderInfo, raw_footer: str, body: buf.Span) -> Self:
+        m = ABS_FOOTER_DATA_SOURCE_PATTERN.search(raw_footer)
+        if m is None:
+            return cls(header, None, None, body)
+        return cls(header, m.group("data_source"), int(m.group("year")), body)
+
+
+def _is_archive(path: Union[Path, str]) -> bool:
+    return Path(path).suffix.lower() in ARCHIVE_SUFFIXES
+
+
+def _is_csv_member(info: zipfile.ZipInfo) -> bool:
+    return not info.is_dir() and info.filename.lower().endswith(".csv")
+
+
+class _LineEndingTranslator:
+    """Incrementally translates Windows (CRLF) line endings in a stream of chunks to LF, if the first line ends with
+    CRLF. A CR may end one chunk and its LF start the next, so a trailing CR is held back until the next chunk."""
+
+    def __init__(self):
+        self._crlf: Optional[bool] = None  # unknown until the first newline arrives
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        chunk = self._pending + chunk
+        if self._crlf is None:
+            if b"\n" not in chunk:
+                self._pending = chunk
+                return b""
+            self._crlf = _has_crlf_line_endings(chunk)
+        if not self._crlf:
+            self._pending = b""
+            return chunk
+        self._pending = chunk[-1:] if chunk.endswith(b"\r") else b""
+        return chunk[: len(chunk) - len(self._pending)].replace(b"\r\n", b"\n")
+
+    def flush(self) -> bytes:
+        pending, self._pending = self._pending, b""
+        return pending
+
+
+def _lf_line_endings(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Translate Windows (CRLF) line endings in a stream of chunks to LF, if the first line ends with CRLF."""
+    translator = _LineEndingTranslator()
+    for chunk in chunks:
+        yield translator.feed(chunk)
+    yield translator.flush()
+
+
+async def _alf_line_endings(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Async equivalent of `_lf_line_endings`"""
+    translator = _LineEndingTranslator()
+    async for chunk in chunks:
+        yield translator.feed(chunk)
+    yield translator.flush()
+
+
+def _has_crlf_line_endings(buffer) -> bool:
+    first_newline = buffer.find(b"\n")
+    return first_newline > 0 and buffer[first_newline - 1] == ord("\r")
+
+
+async def _aiter_chunks(source: AsyncSource, chunk_size: int, loop: asyncio.AbstractEventLoop) -> AsyncIterator[bytes]:
+    if isinstance(source, (str, Path)):
+        f = await loop.run_in_executor(None, open, source, "rb")
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            f.close()
+    elif hasattr(source, "read"):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            yield chunk
+
+
+def _read_table_in_process(
+    cls: type, source: Union[Path, bytes, bytearray, str], index: buf.SectionIndex, kwargs: dict
+) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """`TableBuilderReader.read_table` of an already indexed file, module level so it can be used by a process pool."""
+    reader = cls.from_mmap(source) if isinstance(source, Path) else cls(buffer=source)
+    reader._section_index = index
+    return reader.read_table(**kwargs)
+
+
+class _FileSpan(NamedTuple):
+    """Picklable reference to part of a file, so that worker processes can map the file rather than be sent text."""
+
+    path: Path
+    start: int
+    end: int
+
+
+def _read_wafer(
+    body: Union[str, _FileSpan], parse_kwargs: dict, format_kwargs: dict
+) -> Union[pd.DataFrame, "SparseTable"]:
+    """Parse and format a single wafer, module level so it can be used by a process pool."""
+    if isinstance(body, _FileSpan):
+        with open(body.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            table = _parse_main_table_span(buffer, body.start, body.end, **parse_kwargs)
+    else:
+        table = _parse_main_table(body, **parse_kwargs)
+    return _format_table(table, **format_kwargs)
+
+
+class SparseTable(NamedTuple):
+    """Table read with `read_table(sparse="scipy")`, the values with the row and column labels of the table."""
+
+    matrix: "scipy.sparse.csr_matrix"
+    index: pd.Index
+    columns: pd.Index
+
+
+def _check_sparse_option(sparse: SparseOption, as_index: bool):
+    if sparse not in (False, True, "scipy"):
+        raise ValueError(f"Unknown sparse option {sparse!r}, expected a bool or 'scipy'")
+    if sparse == "scipy" and not as_index:
+        raise ValueError("sparse='scipy' requires as_index=True, the row labels are returned as SparseTable.index")
+
+
+def _format_table(
+    table: "TableBuilderResult",
+    *,
+    as_index: bool,
+    drop_totals: Optional[Literal["rows", "columns", "both"]],
+    compact: bool,
+    sparse: SparseOption,
+) -> Union[pd.DataFrame, SparseTable]:
+    df = table.get_df(as_index=as_index, drop_totals=drop_totals, compact=compact, copy=False)
+    if sparse == "scipy":
+        return SparseTable(df.sparse.to_coo().tocsr(), df.index, df.columns)
+    return df
+
+
 def _extract_header(contents: List[str], header_maxlines: int, pattern: Union[Pattern, str]) -> Tuple[str, int]:
     if not isinstance(contents, List):
         raise ValueError("'contents' should be newline delimited list")
@@ -208,7 +949,7 @@ class ParsedHeaderData:
     num_col_index_cols: int
     col_headers_map: Dict[str, List[str]]
     col_dimension: List[str]  # column dimension label
-    data_without_headers: List[str]
+    num_header_lines: int  # number of lines consumed by the headers, the data starts on the following line
 
     def __post_init__(self):
         self.total_num_columns = self.num_row_index_cols + self.num_col_index_cols
@@ -224,19 +965,21 @@ def _at_index_headers(line: str, line_no: int, num_entries_in_line, num_entries_
         return not line.startswith(",") or num_entries_in_line < num_entries_in_line_prev
 
 
-def _parse_data_headers(lines: List[str]) -> ParsedHeaderData:
+def _parse_data_headers(lines: Iterable[str]) -> ParsedHeaderData:
     """Parse the column headers of a data section of the Table Builder file.
 
+    Lines are consumed lazily, only up to the end of the headers, so `lines` may be an iterator over a larger body.
     Note this is not parsing the metadata header at the start of the entire file.
     """
     # pull the (multiindex) column headers off the data
     # Do this by detecting the first index row (which must end with blank cells underneath the column headers)
-
-    if len(lines) == 0:
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
         raise ValueError("want hinting to know loop is not empty")
     # number of index headers is number of blank cols in the headers line +1
     # (the last index header sits vertically under the column dimension label)
-    num_blank_cols_preceding_col_headers = re.match(",*", lines[0]).end()
+    num_blank_cols_preceding_col_headers = re.match(",*", first_line).end()
     num_row_index_columns = num_blank_cols_preceding_col_headers + 1
 
     col_dimensions = []
@@ -246,18 +989,18 @@ def _parse_data_headers(lines: List[str]) -> ParsedHeaderData:
 
     hit_break = False
 
-    for n, line in enumerate(lines):
+    for n, line in enumerate(chain([first_line], lines)):
         # this ignores the preceding commas before columns / above index (they're not quote wrapped)
-        row_items = RE_QUOTE_WRAPPED_CSV_SPLITTER_AND_CS.findall(line)
+        row_items = _split_header_line(line)
         num_entries_in_line = len(row_items)
 
         if not _at_index_headers(line, n, num_entries_in_line, num_entries_in_line_old):
-            col_header_label, *col_headers_list = row_items[num_blank_cols_preceding_col_headers:]
+            if num_entries_in_line <= num_blank_cols_preceding_col_headers:
+                raise ValueError(f"Malformed file, no column dimension label in header line:\n{line}")
+            col_header_label = row_items[num_blank_cols_preceding_col_headers]
 
             # Multiindex headers are Ragged e.g. Age-Gender, will be [10, M], [ ,F], [11, M], [ , F], ...
-            col_headers = (
-                pd.Series([i if i != "" else pd.NA for i in col_headers_list], dtype="string").ffill().tolist()
-            )
+            col_headers = _ffill_header_labels(row_items, num_blank_cols_preceding_col_headers + 1)
             col_dimensions.append(col_header_label)
             column_headers_map[col_header_label] = col_headers
 
@@ -271,8 +1014,6 @@ def _parse_data_headers(lines: List[str]) -> ParsedHeaderData:
     if not hit_break:
         raise ValueError("Malformed file, never detected the end of index headers")
 
-    rest = lines[n + 1 :]
-
     rows_header_list = RE_QUOTE_WRAPPED_CSV_SPLITTER.findall(row_index_header_row)
     num_col_index_cols = len(column_headers_map[col_dimensions[-1]])  # ncols in csv with data, not labels in them
     return ParsedHeaderData(
@@ -281,10 +1022,38 @@ def _parse_data_headers(lines: List[str]) -> ParsedHeaderData:
         num_col_index_cols,
         column_headers_map,
         col_dimensions,
-        data_without_headers=rest,
+        num_header_lines=n + 1,
     )
 
 
+def _split_header_line(line: str) -> List[str]:
+    """Split a header line into its entries, as `RE_QUOTE_WRAPPED_CSV_SPLITTER_AND_CS.findall` does.
+
+    Each comma terminates an entry, which is the text inside the quotes for quoted entries and "" otherwise (text
+    after the last comma is dropped). Header lines of wide tables have tens of thousands of entries, so well formed
+    lines (only commas outside quotes, and a comma after each quoted entry) are split by the csv module in a single
+    pass, falling back to the regex otherwise.
+    """
+    outside = line.split('"')[::2]  # the text outside quotes
+    separators = "".join(outside)
+    if line.count('"') % 2 == 0 and separators.count(",") == len(separators) and all(outside[1:]) and line:
+        entries = next(csv.reader([line]))
+        entries.pop()  # the (empty) text after the last comma
+        return entries
+    return RE_QUOTE_WRAPPED_CSV_SPLITTER_AND_CS.findall(line)
+
+
+def _ffill_header_labels(entries: List[str], start: int) -> List:
+    """Forward fill the blank (ragged) labels of entries[start:], leading blanks become `pd.NA`."""
+    labels = accumulate(chain([pd.NA], islice(entries, start, None)), _fill_blank)
+    next(labels)
+    return list(labels)
+
+
+def _fill_blank(previous, label: str):
+    return label or previous
+
+
 class TableBuilderResult:
     def __init__(
         self,
@@ -292,39 +1061,72 @@ class TableBuilderResult:
         index_headers: List[str],
         column_headers: Dict[str, List[str]],
         column_dimensions: List[str],
+        *,
+        row_labels: Optional[List[pd.Index]] = None,
     ):
         self._df = df
         self.index_headers = index_headers
         self._column_headers = column_headers
         self.column_dimensions = column_dimensions
+        # distinct row labels of each level of the whole table, if df is only part of it (e.g. a chunk), which then
+        # decide whether the row index is coerced to integers rather than the labels of df
+        self.row_labels = row_labels
 
         self._has_multilevel_cols = len(self._column_headers) > 1
 
     def get_column_headers(self) -> Union[List[str], pd.MultiIndex]:
         if self._has_multilevel_cols:
-            return pd.MultiIndex.from_arrays(list(self._column_headers.values()), names=self._column_headers.keys())
+            return _labels_multiindex(list(self._column_headers.values()), names=list(self._column_headers))
         else:
             return self._column_headers[self.column_dimensions[0]]
 
     def get_df(
-        self, as_index: bool = True, *, drop_totals: Optional[Literal["rows", "columns", "both"]] = None
+        self,
+        as_index: bool = True,
+        *,
+        drop_totals: Optional[Literal["rows", "columns", "both"]] = None,
+        compact: bool = False,
+        copy: bool = True,
     ) -> pd.DataFrame:
+        """The parsed table as a DataFrame, as_index, drop_totals and compact are as in `TableBuilderReader.read_table`.
+
+        copy=False hands over the parsed frame to build the result in place rather than copying it first, so no
+        memory is needed for a second copy of the table. The result can then only be got once, further calls raise
+        a ValueError.
+        """
+        if self._df is None:
+            raise ValueError("The parsed table has already been consumed by get_df(copy=False)")
         col_headers = self.get_column_headers()
         index_headers = self.index_headers
-        out = self._df.copy()
+        if copy:
+            out = self._df.copy()
+        else:
+            out, self._df = self._df, None
+        if compact:
+            with _stats.stage("compact"):
+                for c in index_headers:
+                    if out[c].dtype == object:
+                        out[c] = out[c].astype("category")
         if as_index:
-            out = out.set_index(index_headers)
+            with _stats.stage("set_index"):
+                # in place, so the values are kept as they are rather than copied into a new frame
+                if len(index_headers) > 1:
+                    out.index = _labels_multiindex([out.pop(c).array for c in index_headers], names=index_headers)
+                else:
+                    out.set_index(index_headers, inplace=True)
             if drop_totals in ("rows", "both"):
                 if isinstance(out.index, pd.MultiIndex):
-                    level = 0
+                    level, has_totals = 0, "Total" in out.index.levels[0]
                 else:
-                    level = None
-                out = out.drop(index="Total", level=level)
-            try:
-                out.index = out.index.astype("int64")
-            except (TypeError, OverflowError, ValueError):
-                pass
-
+                    level, has_totals = None, "Total" in out.index
+                if has_totals:  # otherwise skip the drop, which would copy the frame even with nothing to drop
+                    with _stats.stage("drop_totals"):
+                        out = out.drop(index="Total", level=level)
+            with _stats.stage("index_coercion"):
+                out.index = _coerce_int_index(out.index, self._all_row_labels(drop_totals))
+
+            if compact:
+                col_headers = _as_categorical_labels(col_headers)
             if not self._has_multilevel_cols:
                 col_headers = pd.Index(col_headers, name=self.column_dimensions[0])
 
@@ -334,41 +1136,1008 @@ class TableBuilderResult:
                     "Column labels are not very useful with as_index=False when the source data has multilevel "
                     "columns. Use as_index=True and re-format the result instead."
                 )
-                col_headers = ["_".join(col).strip() for col in col_headers]
+                col_headers = _flat_column_labels(col_headers)
 
             col_headers = self.index_headers + col_headers
             if drop_totals in ("rows", "both"):
                 warn("dropping row totals not supported with index=False, ignoring")
 
         out.columns = col_headers
-        if drop_totals in ("columns", "both"):
-            out = out.drop(columns="Total")
+        if drop_totals in ("columns", "both") and "Total" in out.columns:
+            with _stats.stage("drop_totals"):
+                del out["Total"]  # in place, unlike drop which copies the remaining columns
+        if compact:
+            with _stats.stage("compact"):
+                value_columns = out.columns if as_index else out.columns[len(index_headers) :]
+                out = _downcast_values(out, value_columns=value_columns)
 
         return out
 
+    def _all_row_labels(self, drop_totals: Optional[Literal["rows", "columns", "both"]]) -> Optional[pd.Index]:
+        if self.row_labels is None or len(self.row_labels) > 1:
+            return None
+        labels = self.row_labels[0]
+        return labels[labels != "Total"] if drop_totals in ("rows", "both") else labels
+
+
+def _coerce_int_index(index: pd.Index, all_labels: Optional[pd.Index] = None) -> pd.Index:
+    """Convert the (single level) row labels to int64 if they are all integers, e.g. area codes once the "Total"
+    row is dropped.
+
+    Rather than attempting the conversion of every index, which converts the whole index before failing for text
+    labels, the first and last labels (e.g. a trailing "Total" row) and then each unique label are matched against
+    an integer pattern first.
+    all_labels are the labels of the whole table if index is only part of it (e.g. a chunk), which decide whether
+    the index is converted instead, so that every part of the table is converted alike.
+    """
+    if all_labels is not None and not pd.api.types.is_integer_dtype(_coerce_int_index(all_labels).dtype):
+        return index
+    if isinstance(index, pd.MultiIndex) or len(index) == 0 or pd.api.types.is_integer_dtype(index.dtype):
+        return index
+    if pd.api.types.is_float_dtype(index.dtype):
+        values = index.to_numpy()
+        # astype would silently truncate fractional labels
+        is_integral = np.isfinite(values).all() and np.array_equal(values, np.trunc(values))
+        return index.astype("int64") if is_integral else index
+    if not (_is_int_like(index[0]) and _is_int_like(index[-1])):
+        return index
+    if not pd.Series(index.unique(), dtype=object).astype(str).str.fullmatch(r"[+-]?\d+").all():
+        return index
+    try:
+        return index.astype("int64")
+    except (TypeError, OverflowError, ValueError):
+        return index
+
+
+def _is_int_like(label) -> bool:
+    if isinstance(label, str):
+        return label.lstrip("+-").isdigit()
+    return pd.api.types.is_integer(label)
+
+
+def _labels_multiindex(labels: List, names: List[str]) -> pd.MultiIndex:
+    """MultiIndex of the levels of (hierarchical) labels, built from their codes rather than `MultiIndex.from_arrays`.
+
+    Categorical labels (e.g. row labels filled as codes) are used as they are. Other labels are factorized only at
+    the start of each run of repeated labels, since the outer levels of TableBuilder labels are long runs of the same
+    label and hashing each of them again would dominate. The result is the same as `MultiIndex.from_arrays`.
+    """
+    levels, codes = [], []
+    for values in labels:
+        if isinstance(values, pd.Categorical):
+            level_codes = values.codes
+            level = pd.CategoricalIndex(values.categories, dtype=values.dtype)
+        else:
+            level_codes, level = _factorize_runs(np.asarray(values, dtype=object if isinstance(values, list) else None))
+        codes.append(level_codes)
+        levels.append(level)
+    return pd.MultiIndex(levels=levels, codes=codes, names=names, verify_integrity=False)
+
+
+def _factorize_runs(values: np.ndarray) -> Tuple[np.ndarray, pd.Index]:
+    """Codes and sorted levels of values, as in `pd.Categorical(values)`, factorizing one label per run of repeats.
+
+    Whether the labels are in runs (outer levels) or not (the innermost level) is judged from the first
+    `RUN_SAMPLE_SIZE` labels, all the labels are factorized directly if not.
+    """
+    sample = values[:RUN_SAMPLE_SIZE]
+    try:
+        if np.count_nonzero(sample[1:] != sample[:-1]) >= len(sample) // 2:
+            codes, uniques = pd.factorize(values, sort=True)
+            return codes, _level_index(uniques)
+        is_start = np.empty(len(values), dtype=bool)
+        is_start[0] = True
+        np.not_equal(values[1:], values[:-1], out=is_start[1:])
+        starts = np.flatnonzero(is_start)
+        start_codes, uniques = pd.factorize(values[starts], sort=True)
+    except TypeError:  # pd.NA labels can't be compared, or labels which can't be sorted e.g. mixed numbers and text
+        categorical = pd.Categorical(values)
+        return categorical.codes, categorical.categories
+    return np.repeat(start_codes, np.diff(np.append(starts, len(values)))), _level_index(uniques)
+
+
+def _level_index(uniques: np.ndarray) -> pd.Index:
+    # like the categories of pd.Categorical, numbers are inferred from object arrays (text labels are left as is)
+    if uniques.dtype == object and len(uniques) > 0 and not isinstance(uniques[0], str):
+        return pd.Index(list(uniques))
+    return pd.Index(uniques)
+
+
+def _flat_column_labels(columns: pd.MultiIndex) -> List[str]:
+    """Labels of multilevel columns joined with "_" (as `"_".join(labels).strip()` of each column), built a level at a
+    time from the codes, so each distinct label is only stripped once. Missing labels are joined as ""."""
+    flat = None
+    for n, (level, codes) in enumerate(zip(columns.levels, columns.codes)):
+        labels = [str(label) for label in level]
+        if n == 0:
+            labels = [label.lstrip() for label in labels]
+        if n == columns.nlevels - 1:
+            labels = [label.rstrip() for label in labels]
+        labels = np.array(labels + [""], dtype=object)[codes]  # missing labels have code -1
+        flat = labels if flat is None else flat + "_" + labels
+    return flat.tolist()
+
+
+def _as_categorical_labels(labels: Union[List[str], pd.MultiIndex]) -> Union[pd.CategoricalIndex, pd.MultiIndex]:
+    if isinstance(labels, pd.MultiIndex):
+        return pd.MultiIndex.from_arrays(
+            [pd.Categorical(labels.get_level_values(n)) for n in range(labels.nlevels)], names=labels.names
+        )
+    return pd.CategoricalIndex(labels)
+
+
+def _downcast_values(df: pd.DataFrame, value_columns: pd.Index) -> pd.DataFrame:
+    """Store integer table values in the narrowest signed integer dtype that holds all of them.
+
+    Signed, so that arithmetic on the counts (e.g. differences of columns) doesn't wrap around as unsigned would.
+    """
+    values = df[value_columns]
+    if len(values.columns) == 0 or not all(pd.api.types.is_integer_dtype(t) for t in values.dtypes):
+        return df  # e.g. the c engine produces floats if cells are missing
+    min_value, max_value = values.min().min(), values.max().max()
+    if pd.isna(min_value):  # no rows
+        return df
+    dtype = _narrowest_signed_dtype(min_value, max_value)
+    if isinstance(values.dtypes.iloc[0], pd.SparseDtype):
+        dtype = pd.SparseDtype(dtype, fill_value=0)
+    if len(values.columns) == len(df.columns):
+        return df.astype(dtype)
+    return df.astype({c: dtype for c in value_columns})
+
+
+def _narrowest_signed_dtype(min_value, max_value) -> type:
+    return next(t for t in SIGNED_INT_DTYPES if np.iinfo(t).min <= min_value and max_value <= np.iinfo(t).max)
+
+
+def _parse_main_table(body: str, **kwargs) -> TableBuilderResult:
+    return _parse_main_table_span(body, 0, len(body), **kwargs)
+
+
+def _parse_main_table_span(
+    buffer,
+    start: int,
+    end: int,
+    engine: Engine = "c",
+    sparse: bool = False,
+    columns: Optional[List[ColumnLabel]] = None,
+    rows: Optional[RowSelection] = None,
+    label_codes: bool = False,
+) -> TableBuilderResult:
+    """Equivalent of `_parse_main_table` for the body at buffer[start:end], without copying out the body first.
+
+    Only the header lines are decoded in python, the data section is read directly from the buffer.
+    sparse=True reads the values into sparse columns, in which case engine is not used.
+    columns / rows select part of the table as it is parsed, see `TableBuilderReader.read_table`.
+    label_codes=True fills the (text) row labels as categoricals, see `_ffill_labels`.
+    """
+    result, data_start, positions, col_headers_map = _parse_span_headers(buffer, start, end, engine, columns)
+    num_values = len(col_headers_map[result.col_dimension[-1]])
+    if rows is not None:
+        with _stats.stage("select_rows"):
+            buffer = _select_rows(buffer, data_start, end, result.num_row_index_cols, rows)
+        data_start, end = 0, len(buffer)
+
+    formatted_data = _read_data_span(buffer, data_start, end, result, positions, engine, sparse)
+    _record_table_size(len(formatted_data), num_values)
+
+    # Fill the sparse ragged index will values in the dataframe
+    with _stats.stage("ffill"):
+        formatted_data = _ffill_labels(formatted_data, result.num_row_index_cols, as_codes=label_codes)
+
+    # Index headers are correct, so let's assign them
+    formatted_data.columns = result.row_headers + [str(i) for i in range(num_values)]
+
+    res = TableBuilderResult(formatted_data, result.row_headers, col_headers_map, result.col_dimension)
+
+    return res
+
+
+def _iter_main_table_chunks(
+    buffer,
+    start: int,
+    end: int,
+    chunksize: int,
+    engine: Engine = "c",
+    sparse: bool = False,
+    columns: Optional[List[ColumnLabel]] = None,
+    rows: Optional[RowSelection] = None,
+    label_codes: bool = False,
+) -> Iterator[TableBuilderResult]:
+    """`_parse_main_table_span` a chunk of (up to) `chunksize` lines of the data section at a time.
+
+    Only the current chunk is held in memory. The ragged row labels are forward filled across chunks from the last
+    row of the previous chunk. Chunks with no (selected) rows are skipped.
+    The row labels of the whole table are scanned first, so that every chunk has the label dtypes of the whole
+    table (rather than e.g. numbers in one chunk and text in the next), and decides int coercion of its row index
+    alike, see `TableBuilderResult`.
+    """
+    result, data_start, positions, col_headers_map = _parse_span_headers(buffer, start, end, engine, columns)
+    num_labels = result.num_row_index_cols
+    num_values = len(col_headers_map[result.col_dimension[-1]])
+    chunks = _iter_chunk_spans(buffer, data_start, end, chunksize, num_labels, rows)
+    if rows is None:
+        chunks = list(chunks)  # only offsets into buffer, so located once for both passes
+    with _stats.stage("scan_row_labels"):
+        row_labels = _scan_row_labels(chunks, num_labels)
+    label_dtypes = [labels.dtype for labels in row_labels]
+    last_labels: List = [None] * num_labels
+
+    if rows is not None:  # selected again, rather than holding every selected chunk
+        chunks = _iter_chunk_spans(buffer, data_start, end, chunksize, num_labels, rows)
+    for chunk_buffer, chunk_start, chunk_end in chunks:
+        formatted_data = _read_data_span(
+            chunk_buffer, chunk_start, chunk_end, result, positions, engine, sparse, label_dtypes
+        )
+        if len(formatted_data) == 0:
+            continue
+        _record_table_size(len(formatted_data), num_values)
+
+        with _stats.stage("ffill"):
+            formatted_data = _ffill_labels(formatted_data, num_labels, initial=last_labels, as_codes=label_codes)
+        last_labels = formatted_data.iloc[-1, :num_labels].tolist()
+
+        formatted_data.columns = result.row_headers + [str(i) for i in range(num_values)]
+        yield TableBuilderResult(
+            formatted_data, result.row_headers, col_headers_map, result.col_dimension, row_labels=row_labels
+        )
+
+
+def _iter_chunk_spans(
+    buffer, start: int, end: int, chunksize: int, num_labels: int, rows: Optional[RowSelection]
+) -> Iterator[Tuple[Union[str, bytes, mmap.mmap], int, int]]:
+    """(buffer, start, end) of each chunk of (up to) `chunksize` lines of the data rows at buffer[start:end], the
+    chunk being a new buffer of the rows selected by `rows` if given."""
+    # state of _select_rows across chunks
+    current_labels, kept_labels = [buf.as_buffer_type(buffer, "")] * num_labels, []
+    pos = start
+    while pos < end:
+        chunk_start, chunk_end = pos, buf.skip_lines(buffer, pos, end, chunksize)
+        pos = chunk_end
+        if rows is None:
+            yield buffer, chunk_start, chunk_end
+        else:
+            with _stats.stage("select_rows"):
+                selected = _select_rows(buffer, chunk_start, chunk_end, num_labels, rows, current_labels, kept_labels)
+            yield selected, 0, len(selected)
+
+
+def _scan_row_labels(
+    chunks: Iterable[Tuple[Union[str, bytes, mmap.mmap], int, int]], num_labels: int
+) -> List[pd.Index]:
+    """The distinct (non blank) row labels of each label column of the data rows in chunks of (buffer, start, end),
+    in order of first appearance, with the dtype the column has when the rows are read as a whole.
+
+    Only the labels at the start of each line are matched, the cells aren't parsed. Each level is found with a
+    single regex pass over the chunk and deduplicated before the labels are handled in python.
+    """
+    uniques: List[Dict] = [{} for _ in range(num_labels)]
+    for buffer, start, end in chunks:
+        for c, labels in enumerate(uniques):
+            # the label of level c, quoted or not, after the labels of the levels before it
+            line_start = _row_labels_pattern(c, capture=False) + '("(?:[^"\n]|"")*"|[^,"\n]*),'
+            first_line = buf.pattern_for(buffer, line_start).match(buffer, start, end)
+            if first_line is not None:
+                labels.setdefault(first_line.group(1))
+            labels.update(dict.fromkeys(buf.pattern_for(buffer, "\n" + line_start).findall(buffer, start, end)))
+    row_labels = []
+    for labels in uniques:
+        # labels can't contain newlines, so are decoded in one go
+        text = "\n".join(labels) if isinstance(next(iter(labels), ""), str) else b"\n".join(labels).decode(buf.ENCODING)
+        # blanks (None) are included while inferring the dtype, as they make integer labels floats
+        unquoted = list(dict.fromkeys(_unquote_label(label) or None for label in text.split("\n")))
+        row_labels.append(pd.Index(_infer_label_dtype(unquoted).dropna()))
+    return row_labels
+
+
+def _unquote_label(label: str) -> str:
+    return _unescape_label(label[1:-1]) if label[:1] == '"' else label
+
+
+def _ffill_labels(
+    df: pd.DataFrame, num_labels: int, initial: Optional[List] = None, as_codes: bool = False
+) -> pd.DataFrame:
+    """Forward fill the ragged row labels, the first `num_labels` columns of df, which are missing (NaN) where
+    TableBuilder leaves them blank because they repeat the label above.
+
+    Each column is filled with a single take of the last present label of each row (rather than `Series.ffill`),
+    and replaced in df in place, which leaves the block of values untouched.
+    initial are labels to fill any missing leading rows with (e.g. from the end of the previous chunk).
+    as_codes=True returns text labels as categoricals: only the present labels are factorized (few of them, for
+    all but the innermost level) and the codes are filled, rather than the repeated labels.
+    """
+    if initial is None:
+        initial = [None] * num_labels
+    for c, first in zip(df.columns[:num_labels], initial):
+        values = df[c].to_numpy()
+        present = pd.notna(values)
+        seeded = first is not None and len(values) > 0 and not present[0]
+        if seeded:
+            is_number = isinstance(first, (int, float, np.number))
+            values = values.copy() if values.dtype == object or is_number else values.astype(object)
+            values[0], present[0] = first, True
+        if as_codes and values.dtype == object and present.any():
+            codes, categories = pd.factorize(values[present], sort=True)
+            df[c] = pd.Categorical.from_codes(_ffill_take(codes, present, missing=-1), categories)
+        elif seeded or not present.all():
+            df[c] = _ffill_array(values, present)
+    return df
+
+
+def _ffill_array(values: np.ndarray, present: Optional[np.ndarray] = None) -> np.ndarray:
+    """Forward filled copy of values (or values itself if nothing is missing)"""
+    if present is None:
+        present = pd.notna(values)
+    if present.all() or not present.any():
+        return values
+    return _ffill_take(values[present], present, missing=values[0])
+
+
+def _ffill_take(present_values: np.ndarray, present: np.ndarray, missing) -> np.ndarray:
+    """Expand present_values (the values at the rows where present is True, at least one) to every row, forward
+    filling the others, and using `missing` for rows before the first present value.
+    """
+    # number of present values up to and including each row, less one, is the index of the value to fill it with
+    source = np.cumsum(present) - 1
+    out = present_values.take(np.maximum(source, 0))
+    out[: int(np.searchsorted(source, 0))] = missing
+    return out
 
-def _parse_main_table(body: str) -> TableBuilderResult:
-    result = _parse_data_headers(lines=body.split("\n"))
 
-    fake_file = StringIO("\n".join(result.data_without_headers))
+def _parse_span_headers(
+    buffer, start: int, end: int, engine: Engine, columns: Optional[List[ColumnLabel]]
+) -> Tuple[ParsedHeaderData, int, Optional[np.ndarray], Dict[str, List[str]]]:
+    """Parse the headers of the table at buffer[start:end].
+
+    Returns the parsed headers, the offset the data starts at, the positions of the selected columns (None for all
+    of them) and the column labels of the selected columns.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    with _stats.stage("parse_headers"):
+        result = _parse_data_headers(buf.iter_lines(buffer, start, end))
+        data_start = buf.skip_lines(buffer, start, end, result.num_header_lines)
+    positions = None if columns is None else _column_positions(result, columns)
+    col_headers_map = result.col_headers_map
+    if positions is not None:
+        col_headers_map = {dim: [labels[p] for p in positions] for dim, labels in col_headers_map.items()}
+    return result, data_start, positions, col_headers_map
+
+
+def _read_data_span(
+    buffer,
+    start: int,
+    end: int,
+    result: ParsedHeaderData,
+    positions: Optional[np.ndarray],
+    engine: Engine,
+    sparse: bool,
+    label_dtypes: Optional[List[np.dtype]] = None,
+) -> pd.DataFrame:
+    """Read the data rows at buffer[start:end] with `engine`. label_dtypes are the dtypes of the row label columns
+    if already decided for the whole table (see `_scan_row_labels`), rather than inferred from these rows."""
+    with _stats.stage("read_data"):
+        if sparse:
+            return _read_data_section_sparse(buffer, start, end, result, positions, label_dtypes)
+        if engine == "numpy" or start >= end:  # csv readers can't read an empty span, numpy gives an empty frame
+            return _read_data_section_numpy(buffer, start, end, result, positions, label_dtypes)
+        if engine == "pyarrow":
+            return _read_data_section_pyarrow(buffer, start, end, result, positions, label_dtypes)
+        with buf.open_span(buffer, start, end) as fh:
+            return _read_data_section(fh, result, positions, label_dtypes)
+
+
+def _column_positions(result: ParsedHeaderData, columns: List[ColumnLabel]) -> np.ndarray:
+    """Positions (in file order) of the value columns selected by `columns`, see `TableBuilderReader.read_table`"""
+    if isinstance(columns, (str, tuple)):
+        columns = [columns]
+    dims = result.col_dimension
+    keys = list(zip(*(result.col_headers_map[dim] for dim in dims)))
+    positions = set()
+    for label in columns:
+        if isinstance(label, tuple):
+            label = tuple(str(level) for level in label)
+            matches = [n for n, key in enumerate(keys) if key == label]
+        else:
+            label = str(label)
+            matches = [n for n, key in enumerate(keys) if key[0] == label]
+        if not matches:
+            raise KeyError(f"Column {label!r} not found in the columns of {' / '.join(dims)!r}")
+        positions.update(matches)
+    return np.array(sorted(positions), dtype=np.intp)
+
+
+def _row_predicate(rows: RowSelection) -> Callable[[Tuple[str, ...]], bool]:
+    if callable(rows):
+        return lambda labels: bool(rows(labels[0] if len(labels) == 1 else labels))
+    if isinstance(rows, (str, tuple)):
+        rows = [rows]
+    wanted = {tuple(str(level) for level in r) if isinstance(r, tuple) else str(r) for r in rows}
+    return lambda labels: labels[0] in wanted or labels in wanted
+
+
+def _select_rows(
+    buffer,
+    start: int,
+    end: int,
+    num_labels: int,
+    rows: RowSelection,
+    current: Optional[List] = None,
+    kept: Optional[List] = None,
+) -> Union[str, bytes]:
+    """The data lines at buffer[start:end] selected by `rows`, as a new buffer of the same type.
+
+    Rows are matched on their forward filled labels. The ragged labels are written out again where the previous
+    selected line no longer provides them, so the selected lines can be read like the original data.
+    current holds the labels forward filled from lines before `start`, and kept the labels of the last line selected
+    before `start` (empty if none), both are updated in place. A table selected in chunks is then the same lines as
+    the table selected as a whole.
+    """
+    keep = _row_predicate(rows)
+    labels_pattern = buf.pattern_for(buffer, _row_labels_pattern(num_labels))
+    empty, newline, quote, sep = (buf.as_buffer_type(buffer, c) for c in ("", "\n", '"', ","))
+    is_text = isinstance(buffer, str)
+
+    if current is None:
+        current = [empty] * num_labels  # forward filled labels of the current line, in the buffer type
+    if kept is None:
+        kept = []
+    selected = []
+    pos = start
+    while pos < end:
+        line_end = buffer.find(newline, pos, end)
+        if line_end == -1:
+            line_end = end
+        if line_end == pos:  # blank line
+            pos += 1
+            continue
+        m = labels_pattern.match(buffer, pos, line_end)
+        if m is None:
+            raise ValueError(f"Could not parse row labels from line:\n{buf.decode_span(buffer, pos, line_end)}")
+        blank = []
+        for c in range(num_labels):
+            label = m.group(2 * c + 1) or m.group(2 * c + 2)
+            if label:
+                current[c] = label
+            blank.append(not label)
+        if keep(tuple(_unescape_label(label if is_text else label.decode(buf.ENCODING)) for label in current)):
+            written = [
+                empty if is_blank and kept and kept[c] == label else quote + label + quote
+                for c, (label, is_blank) in enumerate(zip(current, blank))
+            ]
+            selected.append(sep.join(written) + sep + buffer[m.end() : line_end] + newline)
+            kept[:] = current
+        pos = line_end + 1
+    return empty.join(selected)
+
+
+def _record_table_size(num_rows: int, num_columns: int):
+    stats = _stats.active()
+    if stats is not None:
+        stats.num_rows += num_rows
+        stats.num_columns = max(stats.num_columns, num_columns)
+
+
+def _read_data_section(
+    fh: IO,
+    result: ParsedHeaderData,
+    positions: Optional[np.ndarray] = None,
+    label_dtypes: Optional[List[np.dtype]] = None,
+) -> pd.DataFrame:
+    """Read the data rows following the headers described by `result` from the file handler `fh`.
+
+    positions selects value columns by position, the other columns are skipped by the csv reader.
+    label_dtypes are the dtypes of the row label columns, inferred by the csv reader if None.
+    """
+    if positions is None:
+        usecols = list(range(result.total_num_columns))
+    else:
+        usecols = list(range(result.num_row_index_cols)) + (positions + result.num_row_index_cols).tolist()
     # Note that column names are supplied manually, because column titles might contain commas in them
     # e.g "Managers, nfd". Because the "" wrapping has been stripped out, this would get mangled by the c engine.
-    formatted_data = pd.read_csv(
-        fake_file,
+    return pd.read_csv(
+        fh,
         sep=",",
-        usecols=list(range(result.total_num_columns)),
+        usecols=usecols,
         header=None,
         names=None,  # add the names after the fact, because they could be a multiindex
+        dtype=None if label_dtypes is None else dict(enumerate(label_dtypes)),
         engine="c",
         low_memory=False,
     )
-    # Fill the sparse ragged index will values in the dataframe
-    for c in formatted_data.columns[: result.num_row_index_cols]:
-        formatted_data[c] = formatted_data[c].ffill()
 
-    # Index headers are correct, so let's assign them
-    formatted_data.columns = result.row_headers + [str(i) for i in range(result.num_col_index_cols)]
 
-    res = TableBuilderResult(formatted_data, result.row_headers, result.col_headers_map, result.col_dimension)
+def _read_data_section_pyarrow(
+    buffer,
+    start: int,
+    end: int,
+    result: ParsedHeaderData,
+    positions: Optional[np.ndarray] = None,
+    label_dtypes: Optional[List[np.dtype]] = None,
+) -> pd.DataFrame:
+    """Alternative to `_read_data_section` for the data rows at buffer[start:end] using the `pyarrow.csv` reader.
 
-    return res
+    Type inference is skipped by giving every column a name and type: the row labels are strings (empty for the
+    ragged index) and the cells int64. The labels are then converted to numbers where possible (or to
+    label_dtypes), so the result is the same frame as `_read_data_section`.
+    """
+    import pyarrow as pa
+    from pyarrow import csv
+
+    num_labels = result.num_row_index_cols
+    value_columns = range(num_labels, result.total_num_columns)
+    if positions is not None:
+        value_columns = (positions + num_labels).tolist()
+    # TableBuilder terminates each row with a comma, which is an extra (empty) column as far as csv is concerned
+    first_line = next(buf.iter_lines(buffer, start, end))
+    column_names = [str(c) for c in range(result.total_num_columns + first_line.endswith(","))]
+    label_names = column_names[:num_labels]
+    value_names = [column_names[c] for c in value_columns]
+
+    if isinstance(buffer, str):
+        source = BytesIO(buffer[start:end].encode(buf.ENCODING))
+    else:
+        source = buf.open_span(buffer, start, end)
+    try:
+        with source:
+            table = csv.read_csv(
+                source,
+                read_options=csv.ReadOptions(column_names=column_names),
+                parse_options=csv.ParseOptions(delimiter=","),
+                convert_options=csv.ConvertOptions(
+                    column_types={**{c: pa.string() for c in label_names}, **{c: pa.int64() for c in value_names}},
+                    include_columns=label_names + value_names,
+                    null_values=[""],
+                    strings_can_be_null=True,
+                ),
+            )
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"engine='pyarrow' requires integer cells, use engine='c' instead to parse the table:\n{e}")
+
+    df = pd.DataFrame({int(c): table.column(c).to_numpy() for c in value_names})
+    for c in reversed(range(num_labels)):
+        df.insert(0, c, _infer_label_dtype(table.column(c).to_pandas(), _label_dtype(label_dtypes, c)))
+    return df
+
+
+def _read_long_records_span(
+    buffer,
+    start: int,
+    end: int,
+    *,
+    drop_totals: Optional[Literal["rows", "columns", "both"]],
+    skip_zeros: bool,
+    compact: bool,
+) -> pd.DataFrame:
+    """Long format records of the table at buffer[start:end], see `TableBuilderReader.read_table_to_long_records`.
+
+    Labels are handled once per row / column of the table, and only expanded to the records at the end, as small
+    integer codes. The cells are parsed into a single preallocated array (or only the non zero cells are kept),
+    which becomes the values of the records without a copy. Total columns are skipped while parsing, total rows are
+    dropped in place.
+    """
+    with _stats.stage("parse_headers"):
+        result = _parse_data_headers(buf.iter_lines(buffer, start, end))
+        data_start = buf.skip_lines(buffer, start, end, result.num_header_lines)
+    positions = None
+    if drop_totals in ("columns", "both"):
+        outer_labels = np.asarray(result.col_headers_map[result.col_dimension[0]], dtype=object)
+        positions = np.flatnonzero(outer_labels != "Total")
+    with _stats.stage("read_data"):
+        if skip_zeros:
+            labels, num_rows, rows, cols, values = _read_cells_coo(buffer, data_start, end, result, positions)
+        else:
+            labels, num_rows, values = _read_cells_dense(buffer, data_start, end, result, positions)
+            rows = cols = None
+    _record_table_size(num_rows, result.num_col_index_cols)
+    with _stats.stage("build_records"):
+        return _build_records(
+            result, labels, num_rows, values, rows, cols, positions, drop_totals=drop_totals, compact=compact
+        )
+
+
+def _build_records(
+    result: ParsedHeaderData,
+    labels: List[List[Optional[str]]],
+    num_rows: int,
+    values: np.ndarray,
+    rows: Optional[np.ndarray],
+    cols: Optional[np.ndarray],
+    positions: Optional[np.ndarray],
+    *,
+    drop_totals: Optional[Literal["rows", "columns", "both"]],
+    compact: bool,
+) -> pd.DataFrame:
+    """Records of the parsed cells, values being either the (num_rows, columns) grid of every cell, or the non zero
+    cells at the coordinates rows, cols. positions are the columns of the table parsed, if not all of them."""
+    row_labels = [
+        pd.Series(_ffill_array(_infer_label_dtype(labels[c][:num_rows]).to_numpy()))
+        for c in range(result.num_row_index_cols)
+    ]
+    col_labels = [np.asarray(result.col_headers_map[dim], dtype=object) for dim in result.col_dimension]
+    if positions is not None:
+        col_labels = [level[positions] for level in col_labels]
+
+    keep_rows = None
+    if drop_totals in ("rows", "both"):
+        keep_rows = (row_labels[0] != "Total").to_numpy()
+        row_labels = [level[keep_rows] for level in row_labels]
+    if len(row_labels) == 1:  # consistent with the index of read_table
+        row_labels[0] = _coerce_int_index(pd.Index(row_labels[0]))
+    row_codes = [_label_codes(level) for level in row_labels]
+    col_codes = [_label_codes(level) for level in col_labels]
+
+    if rows is None:
+        if keep_rows is not None:
+            values = _take_rows_in_place(values, keep_rows)
+        # records are in row order, so the labels of each row repeat for each column
+        num_kept_rows, num_cols = values.shape
+        codes = [np.repeat(c, num_cols) for c, _ in row_codes] + [np.tile(c, num_kept_rows) for c, _ in col_codes]
+        values = values.reshape(-1)
+    else:
+        if keep_rows is not None:
+            keep = keep_rows[rows]
+            kept_row_numbers = (np.cumsum(keep_rows) - 1).astype(rows.dtype)
+            rows, cols, values = kept_row_numbers[rows[keep]], cols[keep], values[keep]
+        codes = [c[rows] for c, _ in row_codes] + [c[cols] for c, _ in col_codes]
+
+    columns = {
+        name: pd.Categorical.from_codes(level_codes, categories)
+        for name, level_codes, (_, categories) in zip(
+            result.row_headers + result.col_dimension, codes, row_codes + col_codes
+        )
+    }
+    columns["value"] = _compact_values(values) if compact else values
+    return pd.DataFrame(columns, copy=False)
+
+
+def _label_codes(labels) -> Tuple[np.ndarray, pd.Index]:
+    """Codes, in the narrowest signed dtype which holds them, and categories of a categorical of labels"""
+    codes, categories = pd.factorize(labels)
+    return codes.astype(_narrowest_signed_dtype(-1, len(categories)), copy=False), categories
+
+
+def _take_rows_in_place(values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    """values[keep] of a 2D array, made by moving the kept rows to the start of values (overwriting it) a block at a
+    time, rather than copying the whole array."""
+    kept = np.flatnonzero(keep)
+    for i in range(0, len(kept), NUMPY_ENGINE_BLOCK_ROWS):
+        block = kept[i : i + NUMPY_ENGINE_BLOCK_ROWS]  # rows at or after i, so not yet overwritten
+        values[i : i + len(block)] = values[block]
+    return values[: len(kept)]
+
+
+def _compact_values(values: np.ndarray) -> np.ndarray:
+    if len(values) == 0:
+        return values
+    return values.astype(_narrowest_signed_dtype(values.min(), values.max()), copy=False)
+
+
+def _concat_records(records: List[pd.DataFrame], compact: bool) -> pd.DataFrame:
+    """Concatenate the records of each wafer, removing the columns from records as they are combined."""
+    columns = {}
+    for c in list(records[0].columns):
+        if isinstance(records[0][c].dtype, pd.CategoricalDtype):
+            # combine the categories of each wafer, pd.concat would fall back to object columns if they differ
+            columns[c] = pd.api.types.union_categoricals([r[c] for r in records])
+        else:
+            columns[c] = np.concatenate([r[c].to_numpy() for r in records])
+        for r in records:
+            del r[c]
+    if compact:
+        columns["value"] = _compact_values(columns["value"])
+    return pd.DataFrame(columns, copy=False)
+
+
+def _wide_arrow_table(
+    table: TableBuilderResult, drop_totals: Optional[Literal["rows", "columns", "both"]], wafer: Optional[str]
+) -> "pyarrow.Table":
+    """Arrow equivalent of `table.get_df(as_index=False, drop_totals=...)`, with string row labels.
+
+    The value columns are passed to arrow as their numpy arrays, rather than copied into a new frame.
+    """
+    import pyarrow as pa
+
+    df = table._df
+    num_labels = len(table.index_headers)
+    keep_rows = slice(None)
+    if drop_totals in ("rows", "both"):
+        keep_rows = (df.iloc[:, 0] != "Total").to_numpy()  # total rows of the outermost level, like get_df
+    outer_labels = table._column_headers[table.column_dimensions[0]]
+    if table._has_multilevel_cols:
+        names = _flat_column_labels(table.get_column_headers())
+    else:
+        names = list(outer_labels)
+    drop_columns = drop_totals in ("columns", "both")
+    positions = [p for p, label in enumerate(outer_labels) if not (drop_columns and label == "Total")]
+
+    arrays = []
+    for c in df.columns[:num_labels]:
+        labels = _integral_floats_as_ints(df[c])
+        labels = labels if labels.dtype == object else labels.astype(str)  # e.g. numeric codes inferred by read_csv
+        arrays.append(pa.array(labels.to_numpy()[keep_rows], type=pa.string()))
+    if wafer is not None:
+        arrays.append(_constant_dictionary_array(wafer, len(arrays[0])))
+    for p in positions:
+        arrays.append(pa.array(df.iloc[:, num_labels + p].to_numpy()[keep_rows]))
+    column_names = table.index_headers + (["wafer"] if wafer is not None else []) + [names[p] for p in positions]
+    return pa.Table.from_arrays(arrays, names=column_names)
+
+
+def _long_arrow_table(records: pd.DataFrame, wafer: Optional[str]) -> "pyarrow.Table":
+    """Arrow equivalent of long format `records`, the categorical labels as dictionary(int32, string) columns.
+
+    The dictionary and index types are fixed, so the tables of each wafer have the same schema.
+    """
+    import pyarrow as pa
+
+    arrays, names = [], []
+    for c in records.columns[:-1]:
+        categorical = records[c].array
+        categories = _integral_floats_as_ints(categorical.categories)
+        categories = pa.array([str(category) for category in categories], type=pa.string())
+        arrays.append(pa.DictionaryArray.from_arrays(categorical.codes.astype(np.int32), categories))
+        names.append(c)
+    if wafer is not None:
+        arrays.append(_constant_dictionary_array(wafer, len(records)))
+        names.append("wafer")
+    arrays.append(pa.array(records["value"].to_numpy()))
+    names.append("value")
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _integral_floats_as_ints(labels: Union[pd.Series, pd.Index]) -> Union[pd.Series, pd.Index]:
+    """Float labels that are all integers as nullable Int64, e.g. the numeric codes of a ragged level (floats
+    because of its blanks), so they are written as "3100101" rather than "3100101.0"."""
+    if pd.api.types.is_float_dtype(labels.dtype):
+        values = labels.to_numpy()
+        values = values[~np.isnan(values)]
+        if np.isfinite(values).all() and np.array_equal(values, np.trunc(values)):  # astype would truncate
+            return labels.astype("Int64")
+    return labels
+
+
+def _constant_dictionary_array(value: str, length: int) -> "pyarrow.DictionaryArray":
+    import pyarrow as pa
+
+    return pa.DictionaryArray.from_arrays(np.zeros(length, dtype=np.int32), pa.array([value], type=pa.string()))
+
+
+def _row_labels_pattern(num_row_index_cols: int, capture: bool = True) -> str:
+    # each row label is either quoted (possibly containing commas and escaped "" quotes), unquoted, or empty for the
+    # ragged index. Quoted labels are captured still escaped, see `_unescape_label`
+    group = "(" if capture else "(?:"
+    return f'(?:"{group}(?:[^"\n]|"")*)"|{group}[^,"\n]*)),' * num_row_index_cols
+
+
+def _unescape_label(label: str) -> str:
+    # quotes in quoted csv fields are escaped by doubling them
+    return label.replace('""', '"')
+
+
+def _read_data_section_numpy(
+    buffer,
+    start: int,
+    end: int,
+    result: ParsedHeaderData,
+    positions: Optional[np.ndarray] = None,
+    label_dtypes: Optional[List[np.dtype]] = None,
+) -> pd.DataFrame:
+    """Specialised alternative to `_read_data_section` for the data rows at buffer[start:end].
+
+    TableBuilder data is a dense grid of integers after the row labels, so rather than generic CSV parsing with
+    type inference, the cells are parsed by numpy straight into a preallocated int64 array, a block of rows at a
+    time. Only the row labels are handled as python strings. The result is the same frame as `_read_data_section`.
+    """
+    num_labels = result.num_row_index_cols
+    labels, num_rows, values = _read_cells_dense(buffer, start, end, result, positions)
+    df = pd.DataFrame(values, columns=range(num_labels, num_labels + values.shape[1]))
+    return _insert_labels(df, labels, num_rows, label_dtypes)
+
+
+def _read_cells_dense(
+    buffer, start: int, end: int, result: ParsedHeaderData, positions: Optional[np.ndarray] = None
+) -> Tuple[List[List[Optional[str]]], int, np.ndarray]:
+    """Read the data rows at buffer[start:end] into a preallocated (rows, columns) int64 array of their cells.
+
+    Returns the (unfilled) row labels, the number of rows, and the array. positions selects value columns by
+    position.
+    """
+    num_labels = result.num_row_index_cols
+    num_values = result.num_col_index_cols if positions is None else len(positions)
+    max_rows = buf.count_lines(buffer, start, end)
+    values = np.empty((max_rows, num_values), dtype=np.int64)
+    labels = [[None] * max_rows for _ in range(num_labels)]
+
+    num_rows = 0
+    for block_start, block in _iter_cell_blocks(buffer, start, end, result, labels, positions):
+        num_rows = block_start + len(block)
+        values[block_start:num_rows] = block
+    return labels, num_rows, values[:num_rows]
+
+
+def _read_data_section_sparse(
+    buffer,
+    start: int,
+    end: int,
+    result: ParsedHeaderData,
+    positions: Optional[np.ndarray] = None,
+    label_dtypes: Optional[List[np.dtype]] = None,
+) -> pd.DataFrame:
+    """Sparse equivalent of `_read_data_section_numpy`, the value columns of the frame have a `SparseDtype`.
+
+    Only the non zero cells of each block of rows are kept, so the dense grid of values is never materialised.
+    """
+    from scipy import sparse
+
+    num_labels = result.num_row_index_cols
+    num_values = result.num_col_index_cols if positions is None else len(positions)
+    labels, num_rows, rows, cols, data = _read_cells_coo(buffer, start, end, result, positions)
+    matrix = sparse.coo_matrix((data, (rows, cols)), shape=(num_rows, num_values))
+    df = pd.DataFrame.sparse.from_spmatrix(matrix.tocsc(), columns=range(num_labels, num_labels + num_values))
+    return _insert_labels(df, labels, num_rows, label_dtypes)
+
+
+def _read_cells_coo(
+    buffer, start: int, end: int, result: ParsedHeaderData, positions: Optional[np.ndarray] = None
+) -> Tuple[List[List[Optional[str]]], int, np.ndarray, np.ndarray, np.ndarray]:
+    """Read the non zero cells of the data rows at buffer[start:end] as coordinates (row, column, value), in row
+    order, keeping only the non zero cells of each block of rows.
+
+    Returns the (unfilled) row labels, the number of rows, and the (int32) row and column and (int64) value arrays.
+    positions selects value columns by position.
+    """
+    num_labels = result.num_row_index_cols
+    max_rows = buf.count_lines(buffer, start, end)
+    labels = [[None] * max_rows for _ in range(num_labels)]
+
+    num_rows, rows, cols, data = 0, [np.empty(0, np.int32)], [np.empty(0, np.int32)], [np.empty(0, np.int64)]
+    for block_start, block in _iter_cell_blocks(buffer, start, end, result, labels, positions):
+        num_rows = block_start + len(block)
+        block_rows, block_cols = np.nonzero(block)
+        data.append(block[block_rows, block_cols])
+        rows.append((block_rows + block_start).astype(np.int32))
+        cols.append(block_cols.astype(np.int32))
+    return labels, num_rows, np.concatenate(rows), np.concatenate(cols), np.concatenate(data)
+
+
+def _iter_cell_blocks(
+    buffer,
+    start: int,
+    end: int,
+    result: ParsedHeaderData,
+    labels: List[List[Optional[str]]],
+    positions: Optional[np.ndarray] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Parse the data rows at buffer[start:end], yielding (first row number, int64 cells) a block of rows at a time.
+
+    The row labels are stored into `labels` (one list per label column) as a side effect, with None for missing
+    labels of the ragged index. positions selects value columns by position, so only those are kept.
+    """
+    num_labels, num_values = result.num_row_index_cols, result.num_col_index_cols
+    labels_pattern = buf.pattern_for(buffer, _row_labels_pattern(num_labels))
+    newline, sep = buf.as_buffer_type(buffer, "\n"), buf.as_buffer_type(buffer, ",")
+
+    row, block_start, block_cells = 0, 0, []
+    pos = start
+    while pos < end:
+        line_end = buffer.find(newline, pos, end)
+        if line_end == -1:
+            line_end = end
+        if line_end == pos:  # blank line, skipped like read_csv
+            pos += 1
+            continue
+        m = labels_pattern.match(buffer, pos, line_end)
+        if m is None:
+            raise ValueError(f"Could not parse row labels from line:\n{buf.decode_span(buffer, pos, line_end)}")
+        for c in range(num_labels):
+            label = m.group(2 * c + 1) or m.group(2 * c + 2)
+            if label:  # empty labels are missing values, filled from the previous row
+                labels[c][row] = _unescape_label(label if isinstance(label, str) else label.decode(buf.ENCODING))
+        block_cells.append(buffer[m.end() : line_end].rstrip(sep))
+        row, pos = row + 1, line_end + 1
+        if len(block_cells) == NUMPY_ENGINE_BLOCK_ROWS or pos >= end:
+            yield block_start, _parse_cells_block(block_cells, num_values, sep, positions)
+            block_start, block_cells = row, []
+
+
+def _insert_labels(
+    df: pd.DataFrame,
+    labels: List[List[Optional[str]]],
+    num_rows: int,
+    label_dtypes: Optional[List[np.dtype]] = None,
+) -> pd.DataFrame:
+    for c in reversed(range(len(labels))):
+        df.insert(0, c, _infer_label_dtype(labels[c][:num_rows], _label_dtype(label_dtypes, c)))
+    return df
+
+
+def _parse_cells_block(
+    rows: List[Union[str, bytes]], num_values: int, sep: Union[str, bytes], positions: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Parse the comma separated integer cells of each row into a (len(rows), num_values) int64 array, or only the
+    cells at positions into a (len(rows), len(positions)) array.
+
+    Only the selected cells have to be integers, the others are only located by their separators.
+    """
+    cells = _try_parse_cells(rows, num_values, sep, positions)
+    if cells is None:
+        # find the offending row for the error message
+        for cells_text in rows:
+            if _try_parse_cells([cells_text], num_values, sep, positions) is None:
+                raise ValueError(
+                    f"engine='numpy' requires {num_values} integer cells per row, use engine='c' instead to "
+                    f"parse the row with cells:\n{cells_text!r}"
+                )
+    return cells
+
+
+def _try_parse_cells(
+    rows: List[Union[str, bytes]], num_values: int, sep: Union[str, bytes], positions: Optional[np.ndarray]
+) -> Optional[np.ndarray]:
+    """`_parse_cells_block`, or None if a row doesn't have num_values cells or a selected cell isn't an integer.
+
+    Parsing every cell is faster than locating the selected cells unless few of them are selected, in which case
+    only those are parsed.
+    """
+    if positions is not None and len(positions) <= num_values * SELECTED_CELLS_FRACTION:
+        return _parse_selected_cells(rows, num_values, sep, positions)
+    cells = _fromstring_cells(sep.join(rows), len(rows) * num_values)
+    if cells is None:
+        # an unselected cell may not be an integer
+        return None if positions is None else _parse_selected_cells(rows, num_values, sep, positions)
+    cells = cells.reshape(len(rows), num_values)
+    return cells if positions is None else cells[:, positions]
+
+
+def _parse_selected_cells(
+    rows: List[Union[str, bytes]], num_values: int, sep: Union[str, bytes], positions: np.ndarray
+) -> Optional[np.ndarray]:
+    """Parse only the cells at positions of each row, or None as for `_try_parse_cells`.
+
+    The cells are located by the offsets of the separators in the text, and the text of the selected cells gathered
+    for numpy to parse, so the other cells are never parsed.
+    """
+    if len(positions) == 0:
+        return np.empty((len(rows), 0), dtype=np.int64)
+    text = sep.join(rows)
+    chars = np.frombuffer(text.encode(buf.ENCODING) if isinstance(text, str) else text, dtype=np.uint8)
+    separators = np.flatnonzero(chars == ord(","))
+    if len(separators) != len(rows) * num_values - 1:
+        return None  # the rows don't all have num_values cells
+    cells = (np.arange(len(rows))[:, None] * num_values + positions).ravel()
+    starts = np.where(cells > 0, separators[cells - 1] + 1, 0)
+    lengths = np.append(separators, len(chars))[cells] - starts + 1  # each cell and a separator after it
+    offsets = np.cumsum(lengths) - lengths  # of each cell in the gathered text
+    gather = np.arange(offsets[-1] + lengths[-1]) + np.repeat(starts - offsets, lengths)
+    selected = chars.take(np.minimum(gather, len(chars) - 1))  # the separator after the last cell is past the end
+    selected[offsets + lengths - 1] = ord(",")
+    values = _fromstring_cells(selected[:-1].tobytes(), len(cells))
+    return None if values is None else values.reshape(len(rows), len(positions))
+
+
+def _fromstring_cells(text: Union[str, bytes], size: int) -> Optional[np.ndarray]:
+    """The comma separated integers in text, or None unless there are `size` of them."""
+    try:
+        cells = np.fromstring(text, dtype=np.int64, sep=",")
+    except ValueError:
+        return None  # older numpy warns and returns the values parsed so far instead of raising
+    return cells if cells.size == size else None
+
+
+def _infer_label_dtype(labels: Iterable[Optional[str]], dtype: Optional[np.dtype] = None) -> pd.Series:
+    """Convert labels to numbers where possible, consistent with the type inference of `pd.read_csv`.
+
+    dtype is the dtype to give the labels instead, if already decided (object keeps them as text).
+    """
+    col = pd.Series(labels, dtype=object)
+    if dtype == object:
+        return col
+    try:
+        col = pd.to_numeric(col)
+    except (ValueError, TypeError):
+        return col
+    return col if dtype is None else col.astype(dtype)
+
+
+def _label_dtype(label_dtypes: Optional[List[np.dtype]], c: int) -> Optional[np.dtype]:
+    return None if label_dtypes is None else label_dtypes[c]
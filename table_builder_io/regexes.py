@@ -80,3 +80,13 @@ ABS_FOOTER_METADATA_PATTERN = (
     + with_prefix('"Copyright Commonwealth of Australia, ', ANY_LINE)
     + with_prefix('"ABS data licensed under Creative Commons', ANY_LINE)
 )
+
+# first line of the footer, e.g. "Dataset: Census of Population and Housing, 2021, TableBuilder"
+ABS_FOOTER_DATA_SOURCE_PATTERN = re.compile(
+    '^"(?:Dataset|Data Source|Data source): '
+    + named_capture_group(ANYTHING, group_name="data_source")
+    + ", "
+    + named_capture_group("[0-9]{4}", group_name="year")
+    + ', TableBuilder"$',
+    re.MULTILINE,
+)
@@ -0,0 +1,116 @@
+"""Opt-in instrumentation of reading, recording where time and memory go for each stage of parsing a file."""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, List, Optional
+
+# The stats being recorded in the current context, if any. Stages look this up rather than having stats threaded
+# through every parsing function, so when nothing is being recorded the only cost is this lookup.
+_ACTIVE: ContextVar[Optional["ReadStats"]] = ContextVar("table_builder_io_stats", default=None)
+
+
+class _NullStage:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+@dataclass
+class ReadStats:
+    """Per-stage durations, sizes and (optionally) peak memory of reading TableBuilder files.
+
+    Record by assigning to `TableBuilderReader.stats`, or for everything in a block (including creating the reader)
+    by using the stats as a context manager:
+
+        stats = ReadStats(callback=lambda stage, seconds: logger.debug("%s took %.3fs", stage, seconds))
+        with stats:
+            reader = TableBuilderReader.from_file(path)
+            df = reader.read_table()
+        metrics.publish(stats.as_dict())
+
+    trace_memory=True traces allocations with `tracemalloc`, recording the peak in `peak_memory`. This slows reading
+        down considerably, so is best used for investigation rather than left on.
+    callback is called with (stage name, duration in seconds) as each stage finishes.
+
+    Durations of repeated stages (e.g. once per wafer) are summed. Work done in executor workers
+    (`read_table(workers=...)`) is not recorded.
+    """
+
+    trace_memory: bool = False
+    callback: Optional[Callable[[str, float], None]] = None
+
+    durations: Dict[str, float] = field(default_factory=dict)  # seconds spent in each stage
+    input_size: int = 0  # size of the file contents, bytes (or characters if read as text)
+    num_rows: int = 0  # rows of data read, summed over wafers
+    num_columns: int = 0  # columns of values in the (widest) table
+    num_wafers: int = 0
+    peak_memory: Optional[int] = None  # peak bytes allocated above the starting point, if trace_memory
+
+    def __post_init__(self):
+        self._tokens: List[Token] = []
+        self._started_tracing = False
+        self._baseline_memory = 0
+
+    def __enter__(self) -> "ReadStats":
+        if not self._tokens and self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            if hasattr(tracemalloc, "reset_peak"):  # python 3.9+
+                tracemalloc.reset_peak()
+            self._baseline_memory = tracemalloc.get_traced_memory()[0]
+        self._tokens.append(_ACTIVE.set(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _ACTIVE.reset(self._tokens.pop())
+        if not self._tokens and self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] - self._baseline_memory
+            self.peak_memory = max(peak, self.peak_memory or 0)
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        return False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as (part of) the stage `name`"""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            duration = time.perf_counter() - start
+            self.durations[name] = self.durations.get(name, 0.0) + duration
+            if self.callback is not None:
+                self.callback(name, duration)
+
+    def as_dict(self) -> dict:
+        """The recorded values, flattened for logging or metrics (durations are keyed as "<stage>_seconds")"""
+        out = {f"{name}_seconds": duration for name, duration in self.durations.items()}
+        out.update(
+            input_size=self.input_size,
+            num_rows=self.num_rows,
+            num_columns=self.num_columns,
+            num_wafers=self.num_wafers,
+            peak_memory=self.peak_memory,
+        )
+        return out
+
+
+def active() -> Optional[ReadStats]:
+    """The stats being recorded in the current context, or None"""
+    return _ACTIVE.get()
+
+
+def stage(name: str) -> ContextManager:
+    """Time the enclosed block as the stage `name` of the active stats, doing nothing if there are none"""
+    stats = _ACTIVE.get()
+    return _NULL_STAGE if stats is None else stats.stage(name)
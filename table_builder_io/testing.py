@@ -0,0 +1,155 @@
+"""Generator of synthetic TableBuilder CSV files, for benchmarking and testing the reader at arbitrary sizes.
+
+The files mimic the layout of real TableBuilder exports: header metadata (with filters), ragged multilevel row and
+column labels, optional wafers and the 2016 or 2021 style footer.
+"""
+
+import math
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+from typing_extensions import Literal
+
+FOOTERS = {
+    2016: (
+        '"Data Source: Census of Population and Housing, 2016, TableBuilder"\n'
+        "\n"
+        '"INFO","Cells in this table have been randomly adjusted to avoid the release of confidential data. '
+        'No reliance should be placed on small cells."\n'
+        "\n"
+        "\n"
+        '"Copyright Commonwealth of Australia, 2018, see abs.gov.au/copyright"\n'
+        '"ABS data licensed under Creative Commons, see abs.gov.au/ccby"\n'
+    ),
+    2021: (
+        '"Dataset: Census of Population and Housing, 2021, TableBuilder"\n'
+        "\n"
+        '"INFO","Cells in this table have been randomly adjusted to avoid the release of confidential data. '
+        'No reliance should be placed on small cells."\n'
+        "\n"
+        "\n"
+        '"Copyright Commonwealth of Australia, 2021, see abs.gov.au/copyright"\n'
+        '"ABS data licensed under Creative Commons, see abs.gov.au/ccby"\n'
+    ),
+}
+
+# number of labels in each outer (non innermost) level of multilevel row / column labels
+OUTER_LEVEL_SIZE = 3
+
+
+def make_table_builder_csv(
+    num_rows: int = 100,
+    num_cols: int = 10,
+    *,
+    row_levels: int = 1,
+    col_levels: int = 1,
+    num_wafers: int = 0,
+    filters: Sequence[Tuple[str, str]] = (),
+    census_year: Literal[2016, 2021] = 2021,
+    zero_fraction: float = 0.5,
+    seed: int = 0,
+) -> str:
+    """Contents of a synthetic TableBuilder CSV file.
+
+    num_rows / num_cols: (approximate) number of rows and columns of values in the table, or in each wafer.
+        With multiple levels, the outer levels have `OUTER_LEVEL_SIZE` labels each, and the innermost level is
+        sized so the total is at least the number requested.
+    row_levels / col_levels: number of levels of row and column labels.
+    num_wafers: number of wafers, 0 for a single table.
+    filters: (variable, value) pairs listed in the header after the default summation.
+    census_year: 2016 or 2021, determines the style of the footer and dataset name.
+    zero_fraction: fraction of cells which are zero, the rest are random counts.
+    """
+    if census_year not in FOOTERS:
+        raise ValueError(f"Unknown census_year {census_year!r}, expected one of {list(FOOTERS)}")
+    if col_levels > 1 and row_levels == 1:
+        # the column header lines wouldn't start with a comma, which the reader relies on to find the row headers
+        raise ValueError("Multilevel columns require row_levels > 1")
+    rng = np.random.default_rng(seed)
+    row_dims = [f"R{n} Row Variable {n}" for n in range(row_levels)]
+    col_dims = [f"C{n} Column Variable {n}" for n in range(col_levels)]
+    row_labels = _level_labels(row_dims, num_rows)
+    col_labels = _level_labels(col_dims, num_cols)
+
+    variables = " and ".join(row_dims) + " by " + " and ".join(col_dims)
+    if num_wafers > 0:
+        variables += " by W Wafer Variable"
+    parts = [
+        "Australian Bureau of Statistics\n",
+        "\n",
+        f'"{census_year} Census - Counting Persons, Place of Usual Residence"\n',
+        f'"{variables}"\n',
+        '"Counting: Person Records"\n',
+        "\n",
+        "Filters:\n",
+        '"Default Summation","Person Records"\n',
+        *(f'"{variable}","{value}"\n' for variable, value in filters),
+        "\n",
+    ]
+    if num_wafers == 0:
+        parts.append(_table_body(row_dims, row_labels, col_dims, col_labels, rng, zero_fraction))
+    else:
+        for n in range(num_wafers):
+            parts.append(f'" Wafer {n}"\n')
+            parts.append(_table_body(row_dims, row_labels, col_dims, col_labels, rng, zero_fraction))
+            parts.append("\n\n")
+    parts.append("\n")
+    parts.append(FOOTERS[census_year])
+    return "".join(parts)
+
+
+def write_table_builder_csv(path: Union[Path, str], **kwargs) -> Path:
+    """Write a synthetic TableBuilder CSV file to `path`, kwargs are as in `make_table_builder_csv`."""
+    path = Path(path)
+    path.write_text(make_table_builder_csv(**kwargs))
+    return path
+
+
+def _level_labels(dims: List[str], size: int) -> List[List[str]]:
+    """Labels of each level, as the full product (outer levels vary slowest)"""
+    outer_size = OUTER_LEVEL_SIZE ** (len(dims) - 1)
+    inner_size = max(1, math.ceil(size / outer_size))
+    sizes = [OUTER_LEVEL_SIZE] * (len(dims) - 1) + [inner_size]
+    total = outer_size * inner_size
+    labels = []
+    repeats = total
+    for dim, level_size in zip(dims, sizes):
+        repeats //= level_size
+        code = dim.split(" ", 1)[0]
+        labels.append([f"{code} label {(i // repeats) % level_size}" for i in range(total)])
+    return labels
+
+
+def _ragged(labels: List[str]) -> List[str]:
+    """Blank out repeats of the previous label, as TableBuilder does for all but the innermost level"""
+    return [label if i == 0 or label != labels[i - 1] else "" for i, label in enumerate(labels)]
+
+
+def _quoted(label: str) -> str:
+    return f'"{label}"' if label else ""
+
+
+def _table_body(
+    row_dims: List[str],
+    row_labels: List[List[str]],
+    col_dims: List[str],
+    col_labels: List[List[str]],
+    rng: np.random.Generator,
+    zero_fraction: float,
+) -> str:
+    num_rows, num_cols = len(row_labels[0]), len(col_labels[0])
+    lines = []
+    leading = "," * (len(row_dims) - 1)
+    for n, (dim, labels) in enumerate(zip(col_dims, col_labels)):
+        labels = labels if n == len(col_dims) - 1 else _ragged(labels)
+        lines.append(leading + f'"{dim}",' + ",".join(_quoted(label) for label in labels) + ",")
+    lines.append(",".join(f'"{dim}"' for dim in row_dims) + ",")
+
+    values = rng.integers(1, 1000, size=(num_rows, num_cols))
+    values[rng.random((num_rows, num_cols)) < zero_fraction] = 0
+    ragged_labels = [_ragged(labels) for labels in row_labels[:-1]] + [row_labels[-1]]
+    for row, cells in enumerate(values.tolist()):
+        prefix = ",".join(_quoted(labels[row]) for labels in ragged_labels)
+        lines.append(prefix + "," + ",".join(map(str, cells)) + ",")
+    return "\n".join(lines) + "\n"
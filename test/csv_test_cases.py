@@ -564,3 +564,28 @@ Filters:
 "ABS data licensed under Creative Commons, see abs.gov.au/ccby"
 
 """
+
+
+# quotes within quoted row labels are escaped by doubling them, as in any csv
+ESCAPED_QUOTES_DATA_HEADER = FILTERS_2021_DATA_HEADER
+ESCAPED_QUOTES_DATA_BODY = """
+,"STATE (UR)","New South Wales","Victoria","Total",
+"OCCP Occupation","SAL (UR)",
+"Managers ""Senior"" level","Aarons Pass",1,2,3,
+,"Bay ""North"", Sydney",4,5,9,
+"Labourers","Jervis Bay",6,7,13,
+,"Total",8,9,17,
+"""
+ESCAPED_QUOTES_DATA_FOOTER = FILTERS_2021_DATA_FOOTER
+ESCAPED_QUOTES_DATA = ESCAPED_QUOTES_DATA_HEADER + ESCAPED_QUOTES_DATA_BODY + ESCAPED_QUOTES_DATA_FOOTER
+ESCAPED_QUOTES_DATA_ROW_HEADERS = ['OCCP Occupation', 'SAL (UR)']
+ESCAPED_QUOTES_DATA_COL_HEADERS = ['New South Wales', 'Victoria', 'Total']
+ESCAPED_QUOTES_DATA_DIMENSION = ['STATE (UR)']
+ESCAPED_QUOTES_DATA_INDEX = pd.DataFrame.from_dict({
+    'OCCP Occupation': {0: 'Managers "Senior" level', 1: 'Managers "Senior" level', 2: 'Labourers', 3: 'Labourers'},
+    'SAL (UR)': {0: 'Aarons Pass', 1: 'Bay "North", Sydney', 2: 'Jervis Bay', 3: 'Total'},
+})
+
+ESCAPED_QUOTES_DATA_TEST_DATA = TestData(ESCAPED_QUOTES_DATA_HEADER, ESCAPED_QUOTES_DATA_BODY, ESCAPED_QUOTES_DATA_FOOTER,
+                                         ESCAPED_QUOTES_DATA_ROW_HEADERS, ESCAPED_QUOTES_DATA_COL_HEADERS,
+                                         ESCAPED_QUOTES_DATA_DIMENSION, ESCAPED_QUOTES_DATA_INDEX)
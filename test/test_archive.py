@@ -0,0 +1,83 @@
+import gzip
+import zipfile
+
+import pandas as pd
+import pytest
+
+from table_builder_io import TableBuilderReader
+from test_tabio import TEST_DATA_PATH, assert_tables_equal
+
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+MINI_FILE = TEST_DATA_PATH / "mini_testfile.csv"
+
+
+@pytest.fixture
+def gz_path(tmp_path):
+    path = tmp_path / "extract.csv.gz"
+    path.write_bytes(gzip.compress(WAFER_FILE.read_bytes()))
+    return path
+
+
+@pytest.fixture
+def zip_path(tmp_path):
+    path = tmp_path / "download.zip"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.write(WAFER_FILE, "tables/wafer.csv")
+        archive.write(MINI_FILE, "mini.csv")
+        archive.writestr("readme.txt", "not a table")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [7, 2**20])
+def test_from_archive_gzip(gz_path, chunk_size):
+    reader = TableBuilderReader.from_archive(gz_path, chunk_size=chunk_size)
+    expected = TableBuilderReader.from_mmap(WAFER_FILE)
+    assert reader.section_index == expected.section_index
+    assert reader.read_header_metadata() == expected.read_header_metadata()
+    assert_tables_equal(expected.read_table(), reader.read_table())
+
+
+@pytest.mark.parametrize("method", ["from_file", "from_mmap"])
+def test_archives_read_transparently(gz_path, method):
+    reader = getattr(TableBuilderReader, method)(gz_path)
+    assert_tables_equal(TableBuilderReader.from_mmap(WAFER_FILE).read_table(), reader.read_table())
+
+
+def test_from_archive_zip_members(zip_path):
+    readers = TableBuilderReader.from_archive(zip_path)
+    assert list(readers) == ["tables/wafer.csv", "mini.csv"]
+    expected = TableBuilderReader.from_mmap(WAFER_FILE).read_table()
+    assert_tables_equal(expected, readers["tables/wafer.csv"].read_table())
+
+    mini = TableBuilderReader.from_archive(zip_path, member="mini.csv")
+    pd.testing.assert_frame_equal(mini.read_table(), TableBuilderReader.from_file(MINI_FILE).read_table())
+
+
+def test_from_archive_zip_single_member(tmp_path):
+    path = tmp_path / "download.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.write(MINI_FILE, "mini.csv")
+    expected = TableBuilderReader.from_file(MINI_FILE).read_table()
+    pd.testing.assert_frame_equal(TableBuilderReader.from_archive(path).read_table(), expected)
+    pd.testing.assert_frame_equal(TableBuilderReader.from_file(path).read_table(), expected)
+
+
+def test_from_archive_crlf(tmp_path):
+    path = tmp_path / "windows.csv.gz"
+    path.write_bytes(gzip.compress(MINI_FILE.read_bytes().replace(b"\n", b"\r\n")))
+    expected = TableBuilderReader.from_file(MINI_FILE).read_table()
+    for chunk_size in (1, 10, 2**20):
+        reader = TableBuilderReader.from_archive(path, chunk_size=chunk_size)
+        assert b"\r" not in reader._get_buffer()
+        pd.testing.assert_frame_equal(reader.read_table(), expected)
+
+
+def test_from_archive_errors(zip_path, gz_path):
+    with pytest.raises(ValueError, match="several CSV files"):
+        TableBuilderReader.from_file(zip_path)
+    with pytest.raises(ValueError, match="No member 'missing.csv'"):
+        TableBuilderReader.from_archive(zip_path, member="missing.csv")
+    with pytest.raises(ValueError, match="only be used with zip archives"):
+        TableBuilderReader.from_archive(gz_path, member="wafer.csv")
+    with pytest.raises(ValueError, match="neither a gzip file nor a zip archive"):
+        TableBuilderReader.from_archive(MINI_FILE)
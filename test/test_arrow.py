@@ -0,0 +1,106 @@
+import re
+
+import pandas as pd
+import pytest
+
+from table_builder_io import TableBuilderReader
+from table_builder_io.testing import make_table_builder_csv
+from test_tabio import TEST_DATA_PATH
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+
+
+def _with_string_labels(df: pd.DataFrame, label_columns) -> pd.DataFrame:
+    return df.astype({c: str for c in label_columns})
+
+
+@pytest.mark.filterwarnings("ignore:Column labels are not very useful")
+@pytest.mark.parametrize("engine", ["c", "numpy"])
+@pytest.mark.parametrize(
+    "reader",
+    [
+        TableBuilderReader.from_file(TEST_DATA_PATH / "mini_testfile.csv"),
+        TableBuilderReader.from_string(make_table_builder_csv(20, 12, row_levels=2, col_levels=2)),
+    ],
+)
+def test_to_arrow_wide(reader, engine):
+    table = reader.to_arrow(engine=engine)
+    expected = reader.read_table(as_index=False, engine=engine)
+    label_columns = reader.read_table().index.names
+    assert all(table.schema.field(c).type == pa.string() for c in label_columns)
+    pd.testing.assert_frame_equal(table.to_pandas(), _with_string_labels(expected, label_columns))
+
+    table = reader.to_arrow(engine=engine, drop_totals="both")
+    expected = reader.read_table(engine=engine, drop_totals="both")
+    assert table.num_rows == len(expected)
+    assert table.num_columns == len(label_columns) + len(expected.columns)
+
+
+def test_to_arrow_wafers():
+    reader = TableBuilderReader.from_mmap(WAFER_FILE)
+    wafers = reader.read_table(as_index=False)
+    table = reader.to_arrow()
+    assert table.column_names[:2] == ["SA2 (POW)", "wafer"]
+    assert table.column("wafer").num_chunks == len(wafers)
+    df = table.to_pandas()
+    for title, expected in wafers.items():
+        actual = df[df["wafer"] == title].drop(columns="wafer").reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize("skip_zeros", [False, True])
+def test_to_arrow_long(skip_zeros):
+    reader = TableBuilderReader.from_mmap(WAFER_FILE)
+    expected = reader.read_table_to_long_records(drop_totals="both", skip_zeros=skip_zeros)
+    table = reader.to_arrow(layout="long", drop_totals="both", skip_zeros=skip_zeros)
+    assert table.schema.field("SA2 (UR)").type == pa.dictionary(pa.int32(), pa.string())
+    label_columns = expected.columns[:-1]
+    pd.testing.assert_frame_equal(
+        _with_string_labels(table.to_pandas(), label_columns), _with_string_labels(expected, label_columns)
+    )
+
+
+@pytest.mark.parametrize("layout", ["wide", "long"])
+def test_to_arrow_numeric_row_labels(layout):
+    # numeric codes of the ragged outer level are read as floats (because of its blanks), but written as integers
+    doc = make_table_builder_csv(12, 3, row_levels=2)
+    doc = re.sub(r'"R(\d) label (\d+)"', lambda m: f'"{(int(m.group(1)) + 1) * 100 + int(m.group(2))}"', doc)
+    reader = TableBuilderReader.from_string(doc)
+    assert reader.read_table(as_index=False).iloc[:, 0].dtype == "float64"
+    df = reader.to_arrow(layout=layout).to_pandas()
+    assert set(df["R0 Row Variable 0"].astype(str)) == {"100", "101", "102"}
+    assert set(df["R1 Row Variable 1"].astype(str)) == {"200", "201", "202", "203"}
+
+
+def test_to_parquet_row_groups(tmp_path):
+    reader = TableBuilderReader.from_mmap(WAFER_FILE)
+    path = tmp_path / "wafers.parquet"
+    reader.to_parquet(path, partition_by_wafer=False)
+    assert pq.ParquetFile(path).num_row_groups == len(reader.section_index.wafers)
+    assert pq.read_table(path).equals(reader.to_arrow())
+
+    path = tmp_path / "no_wafers.parquet"
+    mini = TableBuilderReader.from_file(TEST_DATA_PATH / "mini_testfile.csv")
+    mini.to_parquet(path, layout="long")
+    assert pq.read_table(path).equals(mini.to_arrow(layout="long"))
+
+
+def test_to_parquet_partitioned(tmp_path):
+    reader = TableBuilderReader.from_mmap(WAFER_FILE)
+    reader.to_parquet(tmp_path / "dataset", layout="long")
+    assert len(list((tmp_path / "dataset").iterdir())) == len(reader.section_index.wafers)
+    df = pd.read_parquet(tmp_path / "dataset")
+    expected = reader.read_table_to_long_records()
+    assert set(df["wafer"]) == set(expected["wafer"])
+    key = ["wafer", "SA2 (POW)", "SA2 (UR)"]
+    df = df.astype({c: str for c in key}).sort_values(key).reset_index(drop=True)
+    expected = expected.astype({c: str for c in key}).sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(df[expected.columns], expected)
+
+
+def test_unknown_layout():
+    with pytest.raises(ValueError, match="layout"):
+        TableBuilderReader.from_mmap(WAFER_FILE).to_arrow(layout="tall")
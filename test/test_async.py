@@ -0,0 +1,81 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from table_builder_io import TableBuilderReader
+from test_tabio import TEST_DATA_PATH, assert_tables_equal
+
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+
+
+async def _chunks(data: bytes, size: int):
+    for pos in range(0, len(data), size):
+        await asyncio.sleep(0)
+        yield data[pos : pos + size]
+
+
+async def _stream(data: bytes) -> asyncio.StreamReader:
+    stream = asyncio.StreamReader()
+    stream.feed_data(data)
+    stream.feed_eof()
+    return stream
+
+
+@pytest.mark.parametrize("chunk_size", [7, 4096, 2**20])
+def test_aread_path(chunk_size):
+    async def read():
+        reader = await TableBuilderReader.aread(WAFER_FILE, chunk_size=chunk_size)
+        return reader, await reader.aread_table()
+
+    reader, tables = asyncio.run(read())
+    expected = TableBuilderReader.from_mmap(WAFER_FILE)
+    assert reader.section_index == expected.section_index
+    assert reader.read_header_metadata() == expected.read_header_metadata()
+    assert_tables_equal(expected.read_table(), tables)
+
+
+def test_aread_streams():
+    data = WAFER_FILE.read_bytes()
+    expected = TableBuilderReader.from_mmap(WAFER_FILE).read_table()
+
+    async def read():
+        from_stream = await TableBuilderReader.aread(await _stream(data), chunk_size=1000)
+        from_chunks = await TableBuilderReader.aread(_chunks(data, 333))
+        return await asyncio.gather(from_stream.aread_table(), from_chunks.aread_table())
+
+    for tables in asyncio.run(read()):
+        assert_tables_equal(expected, tables)
+
+
+def test_aread_table_process_pool():
+    mini = TEST_DATA_PATH / "mini_testfile.csv"
+    expected = TableBuilderReader.from_file(mini).read_table(drop_totals="both")
+
+    async def read(pool):
+        reader = await TableBuilderReader.aread(mini)
+        mapped = TableBuilderReader.from_mmap(mini)
+        return await asyncio.gather(
+            reader.aread_table(executor=pool, drop_totals="both"), mapped.aread_table(executor=pool, drop_totals="both")
+        )
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        for df in asyncio.run(read(pool)):
+            pd.testing.assert_frame_equal(df, expected)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 2**20])
+def test_aread_crlf(chunk_size):
+    # small chunks split the CR and LF of line endings between chunks
+    data = WAFER_FILE.read_bytes().replace(b"\n", b"\r\n")
+
+    async def read():
+        reader = await TableBuilderReader.aread(_chunks(data, chunk_size))
+        return reader, await reader.aread_table()
+
+    reader, tables = asyncio.run(read())
+    expected = TableBuilderReader.from_mmap(WAFER_FILE)
+    assert b"\r" not in reader._get_buffer()
+    assert reader.section_index == expected.section_index
+    assert_tables_equal(expected.read_table(), tables)
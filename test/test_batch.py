@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from csv_test_cases import MUTTILEVEL_RAGGED_FFILL_TEST
+from table_builder_io import read_many, TableBuilderReader
+from test_tabio import TEST_DATA_PATH, assert_tables_equal
+
+MINI_FILES = [
+    TEST_DATA_PATH / "mini_testfile.csv",
+    TEST_DATA_PATH / "mini_testfile_dataset_footer_variant.csv",
+    TEST_DATA_PATH / "mini_testfile_dataset_footer_variant2.csv",
+]
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+
+
+@pytest.fixture
+def crlf_files(tmp_path):
+    """Copies of MINI_FILES and WAFER_FILE with Windows (CRLF) line endings"""
+    paths = []
+    for path in MINI_FILES + [WAFER_FILE]:
+        paths.append(tmp_path / path.name)
+        paths[-1].write_bytes(path.read_bytes().replace(b"\n", b"\r\n"))
+    return paths
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_many_concat(workers):
+    df = read_many(MINI_FILES, workers=workers)
+    assert df.index.names[0] == "source"
+    assert list(df.index.get_level_values("source").unique()) == [str(p) for p in MINI_FILES]
+    for path in MINI_FILES:
+        assert_frame_equal(df.loc[str(path)], MUTTILEVEL_RAGGED_FFILL_TEST)
+
+
+def test_read_many_dict():
+    result = read_many(MINI_FILES, workers=1, combine="dict", as_index=False)
+    assert list(result.keys()) == [str(p) for p in MINI_FILES]
+    expected = TableBuilderReader.from_file(MINI_FILES[0]).read_table(as_index=False)
+    for df in result.values():
+        assert_frame_equal(df, expected)
+
+
+def test_read_many_directory(tmp_path):
+    for path in MINI_FILES[:2]:
+        (tmp_path / path.name).write_text(path.read_text())
+    df = read_many(tmp_path, workers=1)
+    assert df.index.get_level_values("source").nunique() == 2
+
+
+def test_read_many_wafers():
+    result = read_many([WAFER_FILE, WAFER_FILE], workers=1)
+    assert isinstance(result, dict)
+    for df in result.values():
+        assert df.shape == (2 * 138, 138)
+
+
+def test_read_many_incompatible():
+    with pytest.raises(ValueError, match="Incompatible dataset"):
+        read_many([MINI_FILES[0], WAFER_FILE], workers=1)
+    # compatibility check can be disabled, but then frames and wafer dicts still can't be concatenated
+    result = read_many([MINI_FILES[0], WAFER_FILE], workers=1, combine="dict", check_compatible=False)
+    assert isinstance(result[str(MINI_FILES[0])], pd.DataFrame)
+    assert isinstance(result[str(WAFER_FILE)], dict)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_many_crlf(crlf_files, workers):
+    df = read_many(crlf_files[:-1], workers=workers)
+    for path in crlf_files[:-1]:
+        assert_frame_equal(df.loc[str(path)], MUTTILEVEL_RAGGED_FFILL_TEST)
+    (wafers,) = read_many(crlf_files[-1:], workers=workers, combine="dict").values()
+    expected = TableBuilderReader.from_file(WAFER_FILE).read_table()
+    assert_tables_equal(expected, wafers)
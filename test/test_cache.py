@@ -0,0 +1,92 @@
+import os
+import shutil
+
+import pytest
+from pandas.testing import assert_frame_equal
+
+from table_builder_io import TableBuilderReader, TableCache
+from test_tabio import TEST_DATA_PATH, assert_tables_equal
+
+pytest.importorskip("pyarrow")
+
+MINI_FILE = TEST_DATA_PATH / "mini_testfile.csv"
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+
+
+@pytest.fixture
+def csv_copy(tmp_path):
+    path = tmp_path / "data.csv"
+    shutil.copy(MINI_FILE, path)
+    return path
+
+
+@pytest.mark.parametrize("fingerprint", ["stat", "content"])
+@pytest.mark.parametrize("as_index", [True, False])
+def test_cache_round_trip(tmp_path, fingerprint, as_index):
+    cache = TableCache(tmp_path / "cache", fingerprint=fingerprint)
+    expected = TableBuilderReader.from_file(MINI_FILE).read_table(as_index=as_index, drop_totals="columns")
+    first = cache.read_table(MINI_FILE, as_index=as_index, drop_totals="columns")
+    assert len(os.listdir(tmp_path / "cache")) == 1
+    second = cache.read_table(MINI_FILE, as_index=as_index, drop_totals="columns")
+    assert len(os.listdir(tmp_path / "cache")) == 1
+    assert_frame_equal(expected, first)
+    assert_frame_equal(expected, second)
+    # different arguments are a different entry
+    cache.read_table(MINI_FILE, as_index=as_index)
+    assert len(os.listdir(tmp_path / "cache")) == 2
+
+
+def test_cache_wafers_and_long_format(tmp_path):
+    cache = TableCache(tmp_path)
+    reader = TableBuilderReader.from_file(WAFER_FILE)
+    for _ in range(2):
+        wafers = cache.read_table(WAFER_FILE)
+        expected = reader.read_table()
+        assert_tables_equal(expected, wafers)
+        assert_frame_equal(reader.read_table_to_long_format(), cache.read_table_to_long_format(WAFER_FILE))
+    assert cache.read_header_metadata(WAFER_FILE) == reader.read_header_metadata()
+
+
+def test_cache_crlf(tmp_path):
+    path = tmp_path / "windows.csv"
+    path.write_bytes(MINI_FILE.read_bytes().replace(b"\n", b"\r\n"))
+    cache = TableCache(tmp_path / "cache")
+    reader = TableBuilderReader.from_file(path)
+    assert cache.read_header_metadata(path) == reader.read_header_metadata()  # not cached yet, read by peek
+    for _ in range(2):
+        assert_frame_equal(cache.read_table(path), reader.read_table())
+        assert_frame_equal(cache.read_table_to_long_format(path), reader.read_table_to_long_format())
+    assert cache.read_header_metadata(path) == reader.read_header_metadata()
+
+
+def test_cache_file_modified(tmp_path, csv_copy):
+    cache = TableCache(tmp_path / "cache")
+    cache.read_table(csv_copy)
+    stat = os.stat(csv_copy)
+    os.utime(csv_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache.read_table(csv_copy)
+    assert len(os.listdir(tmp_path / "cache")) == 2
+
+
+def test_cache_invalidate(tmp_path, csv_copy):
+    cache = TableCache(tmp_path / "cache")
+    cache.read_table(csv_copy)
+    cache.read_table(csv_copy, as_index=False)
+    cache.read_table(MINI_FILE)
+    assert cache.invalidate(csv_copy) == 2
+    assert len(os.listdir(tmp_path / "cache")) == 1
+    assert cache.invalidate() == 1
+    assert cache.size_bytes() == 0
+
+
+def test_cache_lru_eviction(tmp_path, csv_copy):
+    cache = TableCache(tmp_path / "cache")
+    cache.read_table(csv_copy)
+    entry_size = cache.size_bytes()
+
+    cache = TableCache(tmp_path / "cache", max_bytes=int(entry_size * 2.5))
+    cache.read_table(csv_copy, drop_totals="rows")
+    cache.read_table(csv_copy)  # hit, becomes most recently used
+    cache.read_table(csv_copy, drop_totals="columns")  # evicts drop_totals="rows"
+    assert len(os.listdir(tmp_path / "cache")) == 2
+    assert cache.size_bytes() <= cache.max_bytes
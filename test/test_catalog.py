@@ -0,0 +1,123 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from table_builder_io import Catalog, TableBuilderReader
+from test_tabio import TEST_DATA_PATH
+
+MINI_FILE = TEST_DATA_PATH / "mini_testfile.csv"
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+
+
+@pytest.fixture
+def extracts(tmp_path):
+    directory = tmp_path / "extracts"
+    (directory / "nested").mkdir(parents=True)
+    shutil.copy(MINI_FILE, directory / "mini.csv")
+    shutil.copy(WAFER_FILE, directory / "nested" / "wafers.csv")
+    (directory / "notes.csv").write_text("not,a,table\n")
+    (directory / "readme.txt").write_text("not matched")
+    return directory
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    with Catalog(tmp_path / "catalog.sqlite") as catalog:
+        yield catalog
+
+
+def test_update_and_find(catalog, extracts):
+    update = catalog.update(extracts, workers=1)
+    mini, wafers, notes = (str(extracts / name) for name in ("mini.csv", "nested/wafers.csv", "notes.csv"))
+    assert sorted(update.added) == sorted([mini, wafers, notes])
+    assert update.updated == update.removed == []
+    assert list(update.failed) == [notes]
+    assert catalog.paths() == sorted([extracts / "mini.csv", extracts / "nested" / "wafers.csv"])
+
+    (entry,) = catalog.find(counting="place of work", dimension=["SA2 (POW)", "SA2 (UR)"])
+    reader = TableBuilderReader.from_mmap(WAFER_FILE)
+    assert entry.path == extracts / "nested" / "wafers.csv"
+    assert entry.header == reader.read_header_metadata()
+    assert entry.section_index == reader.section_index
+    assert entry.row_dimensions == ["SA2 (POW)"]
+    assert entry.column_dimensions == ["SA2 (UR)"]
+    assert entry.wafers == list(reader.read_table())
+    assert entry.num_cells == 138 * 138 * len(entry.wafers)
+
+    assert [e.path.name for e in catalog.find(dimension="sex")] == ["mini.csv"]
+    assert [e.path.name for e in catalog.find(wafer="Technicians")] == ["wafers.csv"]
+    assert [e.path.name for e in catalog.find()] == ["mini.csv", "wafers.csv"]
+    assert catalog.find(counting="Persons", dimension="OCCP") == []
+    assert catalog.find(dataset="%") == []  # search terms are literal substrings
+
+
+def test_entry_open(catalog, extracts):
+    catalog.update(extracts, workers=1)
+    entry = catalog.get(extracts / "mini.csv")
+    reader = entry.open()
+    assert reader._section_index is entry.section_index
+    pd.testing.assert_frame_equal(reader.read_table(), TableBuilderReader.from_file(MINI_FILE).read_table())
+
+    # a modified file is indexed again rather than read at stale offsets
+    path = extracts / "mini.csv"
+    path.write_text(MINI_FILE.read_text().replace(",20710,", ",2071000,"))
+    reader = entry.open()
+    assert reader.section_index != entry.section_index
+    assert reader.read_table().iloc[0, 0] == 2071000
+
+
+def test_crlf(catalog, tmp_path):
+    directory = tmp_path / "windows"
+    directory.mkdir()
+    for source in (MINI_FILE, WAFER_FILE):
+        (directory / source.name).write_bytes(source.read_bytes().replace(b"\n", b"\r\n"))
+    update = catalog.update(directory, workers=1)
+    assert len(update.added) == 2 and update.failed == {}
+
+    (entry,) = catalog.find(wafer="Technicians")
+    expected = TableBuilderReader.from_file(WAFER_FILE)
+    wafers = expected.read_table()
+    assert entry.header == expected.read_header_metadata()
+    assert entry.wafers == list(wafers)
+    # offsets into the LF translated contents, which the entry's reader reads
+    reader = entry.open()
+    assert reader._section_index is entry.section_index
+    assert entry.section_index == TableBuilderReader.from_mmap(WAFER_FILE).section_index
+    for title, df in reader.read_table().items():
+        pd.testing.assert_frame_equal(df, wafers[title])
+
+    entry = catalog.get(directory / MINI_FILE.name)
+    pd.testing.assert_frame_equal(entry.open().read_table(), TableBuilderReader.from_file(MINI_FILE).read_table())
+
+
+def test_update_only_changed_files(catalog, extracts):
+    catalog.update(extracts, workers=1)
+    assert catalog.update(extracts, workers=1) == ([], [], [], {})
+
+    mini = extracts / "mini.csv"
+    stat = mini.stat()
+    os.utime(mini, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (extracts / "nested" / "wafers.csv").unlink()
+    shutil.copy(MINI_FILE, extracts / "nested" / "copy.csv")
+    with ThreadPoolExecutor(2) as executor:
+        update = catalog.update(extracts, executor=executor)
+    assert update.added == [str(extracts / "nested" / "copy.csv")]
+    assert update.updated == [str(mini)]
+    assert update.removed == [str(extracts / "nested" / "wafers.csv")]
+    assert [e.path.name for e in catalog.find(counting="Census Night")] == ["mini.csv", "copy.csv"]
+    assert catalog.find(wafer="Technicians") == []
+
+
+def test_catalog_persists(tmp_path, extracts):
+    with Catalog(tmp_path / "catalog.sqlite") as catalog:
+        catalog.update(extracts, workers=1)
+    with Catalog(tmp_path / "catalog.sqlite") as catalog:
+        expected = TableBuilderReader.from_file(MINI_FILE).read_header_metadata()
+        assert catalog.get(extracts / "mini.csv").header == expected
+        with pytest.raises(ValueError, match="couldn't be read"):
+            catalog.get(extracts / "notes.csv")
+        with pytest.raises(ValueError, match="not in the catalog"):
+            catalog.get(extracts / "missing.csv")
@@ -0,0 +1,101 @@
+import re
+import tracemalloc
+
+from typing import List
+
+import pandas as pd
+import pytest
+
+from table_builder_io import ReadStats, TableBuilderReader
+from table_builder_io.testing import FOOTERS, make_table_builder_csv, write_table_builder_csv
+from test_tabio import TEST_DATA_PATH
+
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+
+multilevel_reader = TableBuilderReader.from_string(make_table_builder_csv(40, 12, row_levels=3, col_levels=2))
+
+
+@pytest.mark.parametrize("engine", ["c", "numpy"])
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize("chunksize", [1, 7, 1000])
+def test_chunks_multilevel(engine, sparse, chunksize):
+    expected = multilevel_reader.read_table(engine=engine, sparse=sparse)
+    chunks = list(multilevel_reader.read_table(engine=engine, sparse=sparse, chunksize=chunksize))
+    assert len(chunks) == -(-len(expected) // chunksize)
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+def _numeric_rows_reader(row_levels: int, last_rows: List[str]) -> TableBuilderReader:
+    """Reader of a synthetic table with numeric row labels (like area codes) followed by rows labelled last_rows"""
+    doc = make_table_builder_csv(30, 4, row_levels=row_levels)
+    doc = re.sub(r'"R(\d) label (\d+)"', lambda m: f'"{(int(m.group(1)) + 1) * 100 + int(m.group(2))}"', doc)
+    body_end = doc.index(FOOTERS[2021]) - 1
+    rows = "".join(f'"{label}",' + "," * (row_levels - 1) + "1,2,3,4,\n" for label in last_rows)
+    return TableBuilderReader.from_string(doc[:body_end] + rows + doc[body_end:])
+
+
+@pytest.mark.parametrize("row_levels", [1, 2])
+@pytest.mark.parametrize("last_rows", [[], ["Total"], ["Not stated", "Total"]])
+@pytest.mark.parametrize("engine", ["c", "numpy"])
+@pytest.mark.parametrize("kwargs", [{}, {"drop_totals": "rows"}, {"rows": lambda labels: True}])
+@pytest.mark.filterwarnings("ignore:dropping row totals")
+def test_chunks_numeric_rows(row_levels, last_rows, engine, kwargs):
+    # the labels of some chunks are all numbers, but chunks have the label dtypes and index of the whole table
+    reader = _numeric_rows_reader(row_levels, last_rows)
+    expected = reader.read_table(engine=engine, **kwargs)
+    for chunksize in (4, 7):
+        chunks = list(reader.read_table(engine=engine, chunksize=chunksize, **kwargs))
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+        chunks = reader.read_table(engine=engine, chunksize=chunksize, as_index=False, **kwargs)
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks, ignore_index=True), reader.read_table(engine=engine, as_index=False, **kwargs)
+        )
+
+
+@pytest.mark.parametrize("chunksize", [3, 10])
+def test_chunks_selection(chunksize):
+    kwargs = dict(columns=["C0 label 1"], rows=lambda labels: labels[2] in ("R2 label 0", "R2 label 1"))
+    expected = multilevel_reader.read_table(**kwargs)
+    chunks = list(multilevel_reader.read_table(chunksize=chunksize, **kwargs))
+    assert all(len(chunk) > 0 for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+def test_chunks_wafers():
+    reader = TableBuilderReader.from_mmap(WAFER_FILE)
+    reader.stats = ReadStats()
+    expected = reader.read_table(as_index=False)
+    num_rows = reader.stats.num_rows
+    reader.stats = ReadStats()
+    chunked = reader.read_table(as_index=False, chunksize=50)
+    assert list(chunked) == list(expected)
+    for title, chunks in chunked.items():
+        chunks = list(chunks)
+        assert all(len(chunk) <= 50 for chunk in chunks)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected[title])
+    assert reader.stats.num_rows == num_rows
+
+
+def test_chunks_memory(tmp_path):
+    path = write_table_builder_csv(tmp_path / "large.csv", num_rows=20000, num_cols=50, row_levels=2, col_levels=2)
+    reader = TableBuilderReader.from_mmap(path)
+    reader.section_index  # noqa: B018, index outside of the measured region
+
+    def peak_memory(read):
+        tracemalloc.start()
+        try:
+            read()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    full = peak_memory(lambda: reader.read_table())
+    chunked = peak_memory(lambda: sum(len(chunk) for chunk in reader.read_table(chunksize=1000)))
+    assert chunked < full / 4
+
+
+def test_chunksize_errors():
+    with pytest.raises(ValueError, match="chunksize"):
+        multilevel_reader.read_table(chunksize=0)
+    with pytest.raises(ValueError, match="chunksize"):
+        TableBuilderReader.from_mmap(WAFER_FILE).read_table(chunksize=10, lazy=True)
@@ -1,8 +1,22 @@
+import re
+import tracemalloc
+
+import numpy as np
 import pytest
+import pandas as pd
 from pandas.api.types import is_integer_dtype
 
-from csv_test_cases import DATASET_WITH_INT_ROWS_AND_TOTALS
+from csv_test_cases import COL_MULTIINDEX_DATA, DATASET_WITH_INT_ROWS_AND_TOTALS, MULTILEVEL_MULTIINDEX_EXPECTED
 from table_builder_io import TableBuilderReader
+from table_builder_io.reader import (
+    RUN_SAMPLE_SIZE,
+    _coerce_int_index,
+    _ffill_labels,
+    _flat_column_labels,
+    _labels_multiindex,
+    _parse_main_table,
+)
+from table_builder_io.testing import make_table_builder_csv
 from test_tabio import TEST_DATA_PATH
 
 raw_data = DATASET_WITH_INT_ROWS_AND_TOTALS
@@ -37,6 +51,85 @@ def test_index_dtype_casting():
     assert is_integer_dtype(df.index.dtype)
 
 
+@pytest.mark.parametrize(
+    "labels, expected_dtype",
+    [
+        (["101", "-102", "103"], "int64"),
+        ([101.0, 102.0], "int64"),
+        (["Brisbane", "101"], "object"),
+        (["101", "Total"], "object"),
+        (["101", "Total", "102"], "object"),
+        ([101, "102", 103], "int64"),
+        ([1.5, 2.0], "float64"),
+        ([1.0, float("nan")], "float64"),
+    ],
+)
+def test_coerce_int_index(labels, expected_dtype):
+    index = _coerce_int_index(pd.Index(labels))
+    assert index.dtype == expected_dtype
+    assert index.astype(str).tolist() == pd.Index(labels).astype(index.dtype).astype(str).tolist()
+
+
+def test_int_row_labels_with_total(monkeypatch):
+    # the trailing Total row keeps the area codes as text without attempting to convert them
+    assert is_integer_dtype(reader.read_table(drop_totals="rows").index.dtype)
+    astype = pd.Index.astype
+
+    def checked_astype(index, dtype, *args, **kwargs):
+        assert dtype != "int64", "attempted to convert the row labels"
+        return astype(index, dtype, *args, **kwargs)
+
+    monkeypatch.setattr(pd.Index, "astype", checked_astype)
+    df = reader.read_table()
+    assert df.index.dtype == object
+    assert df.index[-1] == "Total"
+
+
+@pytest.mark.parametrize("drop_totals", [None, "rows", "both"])
+def test_get_df_without_copy(drop_totals):
+    result = _parse_main_table(reader2.raw_body)
+    expected = result.get_df(drop_totals=drop_totals)
+    pd.testing.assert_frame_equal(result.get_df(drop_totals=drop_totals, copy=False), expected)
+    with pytest.raises(ValueError, match="consumed"):
+        result.get_df()
+
+
+def _ragged_labels() -> pd.DataFrame:
+    nan = float("nan")
+    return pd.DataFrame(
+        {
+            0: [nan, nan, "b", nan, "a", nan],
+            1: ["x", nan, "y", nan, nan, "x"],
+            2: [1.0, 2.0, nan, 4.0, 5.0, 6.0],
+            3: [1, 2, 3, 4, 5, 6],
+        }
+    )
+
+
+@pytest.mark.parametrize("initial", [None, ["z", "w", 0.0]])
+def test_ffill_labels(initial):
+    expected = _ragged_labels()
+    if initial is not None:
+        expected.iloc[0, :3] = expected.iloc[0, :3].fillna(pd.Series(initial, index=expected.columns[:3]))
+    expected.iloc[:, :3] = expected.iloc[:, :3].ffill()
+    pd.testing.assert_frame_equal(_ffill_labels(_ragged_labels(), 3, initial=initial), expected)
+
+    codes = _ffill_labels(_ragged_labels(), 3, initial=initial, as_codes=True)
+    assert all(isinstance(codes[c].dtype, pd.CategoricalDtype) for c in [0, 1])
+    assert codes[2].dtype == "float64"
+    pd.testing.assert_frame_equal(codes.astype({0: object, 1: object}), expected)
+
+
+def test_compact_multilevel_rows():
+    reader = TableBuilderReader.from_string(make_table_builder_csv(200, 4, row_levels=4))
+    df = reader.read_table()
+    compact = reader.read_table(compact=True)
+    assert all(isinstance(level, pd.CategoricalIndex) for level in compact.index.levels)
+    pd.testing.assert_frame_equal(
+        df, compact, check_dtype=False, check_categorical=False, check_index_type=False, check_column_type=False
+    )
+
+
 def test_long_format_processing():
     path = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
     reader = TableBuilderReader.from_file(path)
@@ -49,3 +142,207 @@ def test_long_format_processing():
     row = df.loc[("Morningside - Seven Hills", "Thornlands"), :]
     assert row["Technicians and Trades Workers"].item() == 14
     assert row["Total"].item() == 24
+
+
+@pytest.mark.parametrize("as_index", [True, False])
+@pytest.mark.parametrize("reader", [reader, reader2])
+def test_compact(reader, as_index):
+    df = reader.read_table(as_index=as_index)
+    compact = reader.read_table(as_index=as_index, compact=True)
+    pd.testing.assert_frame_equal(
+        df, compact, check_dtype=False, check_index_type=False, check_column_type=False, check_categorical=False
+    )
+    assert all(dtype.itemsize < 8 for dtype in compact.select_dtypes("number").dtypes)
+    if as_index:
+        assert isinstance(compact.columns, pd.CategoricalIndex)
+    else:
+        assert all(isinstance(compact[c].dtype, pd.CategoricalDtype) for c in df.select_dtypes(object).columns)
+
+
+def test_compact_signed_values():
+    # differences of counts must not wrap around, as they would with unsigned dtypes
+    wafer_reader = TableBuilderReader.from_file(TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv")
+    df, compact = wafer_reader.read_table()["Total"], wafer_reader.read_table(compact=True)["Total"]
+    assert all(pd.api.types.is_signed_integer_dtype(dtype) for dtype in compact.dtypes)
+    difference = compact.iloc[:, 0] - compact.iloc[:, 1]
+    assert difference.min() == (df.iloc[:, 0] - df.iloc[:, 1]).min() < 0
+
+
+def test_compact_memory_usage():
+    reader = TableBuilderReader.from_file(TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv")
+    for title, compact in reader.read_table(compact=True).items():
+        df = reader.read_table()[title]
+        assert compact.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+
+
+def _stacked_records(df: pd.DataFrame) -> pd.DataFrame:
+    return df.stack(list(range(df.columns.nlevels))).rename("value").reset_index()
+
+
+@pytest.mark.filterwarnings("ignore:The previous implementation of stack:FutureWarning")
+@pytest.mark.parametrize("drop_totals", [None, "rows", "both"])
+@pytest.mark.parametrize("skip_zeros", [False, True])
+def test_long_records(drop_totals, skip_zeros):
+    expected = _stacked_records(reader.read_table(drop_totals=drop_totals))
+    if skip_zeros:
+        expected = expected[expected["value"] != 0].reset_index(drop=True)
+    df = reader.read_table_to_long_records(drop_totals=drop_totals, skip_zeros=skip_zeros)
+    assert all(isinstance(df[c].dtype, pd.CategoricalDtype) for c in df.columns[:-1])
+    pd.testing.assert_frame_equal(df, expected, check_categorical=False, check_dtype=False)
+    if drop_totals == "rows":
+        assert is_integer_dtype(df["SA1 (UR)"].cat.categories)
+
+
+@pytest.mark.filterwarnings("ignore:The previous implementation of stack:FutureWarning")
+@pytest.mark.parametrize("num_wafers", [0, 4])
+def test_long_records_peak_memory(num_wafers):
+    # cheaper than stacking the wide frames, which is the point of building the records directly
+    long_reader = TableBuilderReader.from_string(
+        make_table_builder_csv(2000 // max(num_wafers, 1), 100, num_wafers=num_wafers)
+    )
+    long_reader.section_index  # noqa: B018, index outside of the measured region
+
+    def peak_memory(read):
+        tracemalloc.start()
+        try:
+            read()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    stacked = peak_memory(long_reader.read_table_to_long_format)
+    assert peak_memory(long_reader.read_table_to_long_records) < 0.9 * stacked
+    assert peak_memory(lambda: long_reader.read_table_to_long_records(compact=True)) < 0.9 * stacked
+
+
+@pytest.mark.filterwarnings("ignore:The previous implementation of stack:FutureWarning")
+def test_long_records_wafers():
+    reader = TableBuilderReader.from_mmap(TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv")
+    wafers = reader.read_table(drop_totals="columns")
+    expected = pd.concat([_stacked_records(df).assign(wafer=title) for title, df in wafers.items()], ignore_index=True)
+    df = reader.read_table_to_long_records(drop_totals="columns", compact=True)
+    assert list(df.columns) == ["SA2 (POW)", "SA2 (UR)", "wafer", "value"]
+    assert df["value"].dtype.itemsize < 8
+    pd.testing.assert_frame_equal(df, expected[df.columns], check_categorical=False, check_dtype=False)
+
+
+@pytest.mark.filterwarnings("ignore:The previous implementation of stack:FutureWarning")
+def test_long_format_multilevel_columns():
+    reader = TableBuilderReader.from_string(COL_MULTIINDEX_DATA)
+    df = reader.read_table_to_long_format()
+    expected = MULTILEVEL_MULTIINDEX_EXPECTED.stack([0, 1]).to_frame("value")
+    pd.testing.assert_frame_equal(df, expected)
+
+    # wafers are stacked alike, one column of values per wafer
+    reader = TableBuilderReader.from_string(make_table_builder_csv(20, 6, row_levels=2, col_levels=2, num_wafers=2))
+    df = reader.read_table_to_long_format()
+    assert list(df.columns) == ["Wafer 0", "Wafer 1"]
+    assert df.index.nlevels == 4
+    assert len(df) == 21 * 6
+
+
+multilevel_reader = TableBuilderReader.from_string(make_table_builder_csv(20, 12, row_levels=2, col_levels=2))
+
+
+@pytest.mark.parametrize("engine", ["c", "numpy"])
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize(
+    "columns, rows",
+    [
+        (["C0 label 1"], None),
+        ([("C0 label 2", "C1 label 3"), ("C0 label 0", "C1 label 1")], None),
+        (None, ["R0 label 1"]),
+        (None, [("R0 label 0", "R1 label 2"), ("R0 label 2", "R1 label 5")]),
+        (["C0 label 0"], lambda labels: labels[1] in ("R1 label 0", "R1 label 6")),
+    ],
+)
+def test_select_multilevel(engine, sparse, columns, rows):
+    df = multilevel_reader.read_table(engine=engine, sparse=sparse)
+    selected = multilevel_reader.read_table(engine=engine, sparse=sparse, columns=columns, rows=rows)
+    expected = df
+    if columns is not None:
+        expected = expected.loc[:, [c for c in df.columns if c in columns or c[0] in columns]]
+    if rows is not None:
+        keep = rows if callable(rows) else (lambda labels: labels in rows or labels[0] in rows)
+        expected = expected[[keep(labels) for labels in df.index]]
+    assert 0 < selected.size < df.size
+    pd.testing.assert_frame_equal(selected, expected, check_index_type=False)
+
+
+@pytest.mark.parametrize("engine", ["c", "numpy"])
+def test_select_single_level(engine):
+    df = reader.read_table(engine=engine, drop_totals="rows")
+    columns = [df.columns[2], df.columns[0]]
+    rows = [str(df.index[1]), str(df.index[4])]
+    selected = reader.read_table(engine=engine, drop_totals="rows", columns=columns, rows=rows)
+    pd.testing.assert_frame_equal(selected, df.iloc[[1, 4], [0, 2]])
+
+    selected = reader.read_table(engine=engine, rows=lambda label: label.startswith("Total"))
+    assert list(selected.index) == ["Total"]
+
+
+@pytest.mark.parametrize("engine", ["c", "numpy", "pyarrow"])
+@pytest.mark.parametrize("sparse", [False, True])
+@pytest.mark.parametrize("columns", [["C0 label 0"], ["C0 label 0", "C0 label 2", "C0 label 3", "C0 label 4"]])
+def test_select_skips_unselected_cells(engine, sparse, columns):
+    # only the cells of selected columns are converted, whether numpy parses only those or every cell
+    text = make_table_builder_csv(20, 12)
+    malformed = re.sub(r'^("R0 label 3",\d+),\d+,', r"\1,9.5,", text, flags=re.MULTILINE)
+    selected = TableBuilderReader.from_string(malformed).read_table(engine=engine, sparse=sparse, columns=columns)
+    expected = TableBuilderReader.from_string(text).read_table(engine=engine, sparse=sparse, columns=columns)
+    pd.testing.assert_frame_equal(selected, expected)
+    if engine == "numpy":
+        with pytest.raises(ValueError, match=r"9\.5"):
+            TableBuilderReader.from_string(malformed).read_table(engine=engine, sparse=sparse, columns=["C0 label 1"])
+
+
+def test_select_wafers():
+    reader = TableBuilderReader.from_mmap(TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv")
+    wafers = reader.read_table(workers=1)
+    column = wafers["Total"].columns[3]
+    selected = reader.read_table(columns=[column], rows=lambda label: label.startswith("M"))
+    assert list(selected) == list(wafers)
+    for title, df in selected.items():
+        expected = wafers[title].loc[wafers[title].index.str.startswith("M"), [column]]
+        pd.testing.assert_frame_equal(df, expected)
+
+
+def test_select_nothing():
+    df = multilevel_reader.read_table(rows=[])
+    assert df.shape == (0, 12)
+    with pytest.raises(KeyError, match="Unknown"):
+        multilevel_reader.read_table(columns=["Unknown"])
+
+
+@pytest.mark.parametrize(
+    "labels",
+    [
+        [["b", "b", "a", "a", "c"], ["x", "y", "x", "y", "x"]],
+        [[pd.NA, "b", "b", "a"], ["x", "y", "z", "w"]],  # leading missing column label
+        [[float("nan"), "a", "a", "b"], [3, 1, 2, 1]],
+        [["a", 1, 1, "b"], ["x", "y", "z", "w"]],  # can't be sorted
+        [[f"outer {n // 5000}" for n in range(3 * RUN_SAMPLE_SIZE)], [f"{n % 7}" for n in range(3 * RUN_SAMPLE_SIZE)]],
+        [[], []],
+    ],
+)
+def test_labels_multiindex(labels):
+    expected = pd.MultiIndex.from_arrays(labels, names=["outer", "inner"])
+    arrays = [np.array(level, dtype=object) for level in labels[:-1]] + [labels[-1]]
+    actual = _labels_multiindex(arrays, names=["outer", "inner"])
+    pd.testing.assert_index_equal(actual, expected, exact=True)
+    for actual_level, expected_level in zip(actual.levels, expected.levels):
+        pd.testing.assert_index_equal(actual_level, expected_level, exact=True)
+
+    categorical = [pd.Categorical(level) for level in labels]
+    pd.testing.assert_index_equal(
+        _labels_multiindex(categorical, names=["outer", "inner"]),
+        pd.MultiIndex.from_arrays(categorical, names=["outer", "inner"]),
+        exact=True,
+    )
+
+
+def test_flat_column_labels():
+    columns = pd.MultiIndex.from_arrays([[" a", " a", "b"], ["x ", "y", " z "], ["1", "2", "3 "]])
+    assert _flat_column_labels(columns) == ["_".join(labels).strip() for labels in columns]
+    columns = pd.MultiIndex.from_arrays([[pd.NA, "a"], ["x", "y"]])
+    assert _flat_column_labels(columns) == ["_x", "a_y"]
@@ -1,5 +1,10 @@
+import gzip
+import io
+import tempfile
 import unittest
 from io import StringIO
+from pathlib import Path
+from unittest import mock
 from table_builder_io.regexes import *
 
 from csv_test_cases import (
@@ -10,6 +15,20 @@ from csv_test_cases import (
 )
 from table_builder_io import TableBuilderReader
 from table_builder_io.parse_metadata import HeaderInfo
+from table_builder_io.testing import write_table_builder_csv
+
+TEST_DATA_PATH = Path(__file__).parent
+
+
+class _CountingFile(io.FileIO):
+    """Binary file recording how many bytes have been read from it"""
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        _CountingFile.bytes_read += len(data)
+        return data
 
 
 class TestMetadataSplitting(unittest.TestCase):
@@ -62,3 +81,51 @@ class TestMetadataSplitting(unittest.TestCase):
         self.assertEqual(hi.counting, "Person Records")
         self.assertEqual(hi.filters, ["STATE (UR)==Queensland", "AGE10P Age in Ten Year Groups==40-49 years"])
         self.assertEqual(hi.summation, "Person Records")
+
+
+class TestPeek(unittest.TestCase):
+    def test_peek_matches_reader(self):
+        for path in sorted(TEST_DATA_PATH.glob("*.csv")):
+            with self.subTest(path.name):
+                peek = TableBuilderReader.peek(path)
+                reader = TableBuilderReader.from_mmap(path)
+                self.assertEqual(peek.header, reader.read_header_metadata())
+                self.assertEqual(peek.body, reader.section_index.body)
+                self.assertEqual(peek.data_source, "Census of Population and Housing")
+                self.assertIn(peek.year, (2016, 2021))
+
+    def test_peek_large_file_reads_only_the_ends(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_table_builder_csv(
+                Path(tmp) / "large.csv", num_rows=20000, num_cols=20, num_wafers=3, census_year=2021
+            )
+            _CountingFile.bytes_read = 0
+            with mock.patch("builtins.open", lambda file, mode="r": _CountingFile(file, "r")):
+                peek = TableBuilderReader.peek(path)
+            self.assertLess(_CountingFile.bytes_read, 3 * 2**16)
+            self.assertGreater(path.stat().st_size, 20 * 2**16)
+
+            reader = TableBuilderReader.from_mmap(path)
+            self.assertEqual(peek.header, reader.read_header_metadata())
+            self.assertEqual(peek.body, reader.section_index.body)
+            self.assertEqual(peek.year, 2021)
+
+    def test_peek_crlf(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for path in sorted(TEST_DATA_PATH.glob("*.csv")):
+                with self.subTest(path.name):
+                    crlf_path = Path(tmp) / path.name
+                    crlf_path.write_bytes(path.read_bytes().replace(b"\n", b"\r\n"))
+                    peek, expected = TableBuilderReader.peek(crlf_path), TableBuilderReader.peek(path)
+                    self.assertEqual(peek.header, expected.header)
+                    self.assertEqual((peek.data_source, peek.year), (expected.data_source, expected.year))
+                    # offsets into the file itself, the body being that of the LF file with its line endings
+                    body = crlf_path.read_bytes()[slice(*peek.body)]
+                    self.assertEqual(body, path.read_bytes()[slice(*expected.body)].replace(b"\n", b"\r\n"))
+
+    def test_peek_gzip(self):
+        path = TEST_DATA_PATH / "mini_testfile.csv"
+        with tempfile.TemporaryDirectory() as tmp:
+            gz_path = Path(tmp) / "mini_testfile.csv.gz"
+            gz_path.write_bytes(gzip.compress(path.read_bytes()))
+            self.assertEqual(TableBuilderReader.peek(gz_path), TableBuilderReader.peek(path))
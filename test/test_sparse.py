@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal, assert_index_equal
+
+from csv_test_cases import DATASET_WITH_INT_ROWS_AND_TOTALS, MULTILEVEL_ROWS, OD_DATA1
+from table_builder_io import TableBuilderReader
+from table_builder_io.reader import SparseTable
+from test_tabio import TEST_DATA_PATH
+
+pytest.importorskip("scipy")
+
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+
+
+def densify(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({c: dtype.subtype for c, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)})
+
+
+@pytest.mark.parametrize(
+    "doc, drop_totals",
+    [(MULTILEVEL_ROWS, None), (OD_DATA1, None), (DATASET_WITH_INT_ROWS_AND_TOTALS, "both")],
+    ids=["multilevel_rows", "od", "int_rows_totals"],
+)
+@pytest.mark.parametrize("as_index", [True, False])
+@pytest.mark.filterwarnings("ignore:dropping row totals")
+def test_sparse_matches_dense(doc, drop_totals, as_index):
+    reader = TableBuilderReader.from_string(doc)
+    expected = reader.read_table(as_index=as_index, drop_totals=drop_totals)
+    result = reader.read_table(as_index=as_index, drop_totals=drop_totals, sparse=True)
+    assert any(isinstance(dtype, pd.SparseDtype) for dtype in result.dtypes)
+    assert_frame_equal(densify(result), expected)
+
+
+@pytest.mark.parametrize("reader", [TableBuilderReader.from_file(WAFER_FILE), TableBuilderReader.from_mmap(WAFER_FILE)])
+def test_sparse_wafers(reader):
+    expected = reader.read_table()
+    result = reader.read_table(sparse=True)
+    with ThreadPoolExecutor(2) as pool:
+        concurrent = reader.read_table(sparse=True, executor=pool)
+    assert list(result.keys()) == list(expected.keys())
+    for title, df in expected.items():
+        assert_frame_equal(densify(result[title]), df)
+        assert_frame_equal(densify(concurrent[title]), df)
+        # the table is mostly zeros
+        assert result[title].memory_usage(index=False).sum() < df.memory_usage(index=False).sum() / 1.5
+
+
+def test_sparse_scipy():
+    reader = TableBuilderReader.from_mmap(WAFER_FILE)
+    expected = reader.read_table(drop_totals="both")
+    result = reader.read_table(sparse="scipy", drop_totals="both")
+    for title, df in expected.items():
+        table = result[title]
+        assert isinstance(table, SparseTable)
+        assert table.matrix.format == "csr"
+        np.testing.assert_array_equal(table.matrix.toarray(), df.to_numpy())
+        assert_index_equal(table.index, df.index)
+        assert list(table.columns) == list(df.columns)
+
+
+def test_sparse_options():
+    reader = TableBuilderReader.from_string(OD_DATA1)
+    with pytest.raises(ValueError, match="as_index"):
+        reader.read_table(sparse="scipy", as_index=False)
+    with pytest.raises(ValueError, match="sparse option"):
+        reader.read_table(sparse="coo")
@@ -0,0 +1,55 @@
+import pytest
+
+from table_builder_io import ReadStats, TableBuilderReader
+from table_builder_io import stats as stats_module
+from test_tabio import TEST_DATA_PATH
+
+MINI_FILE = TEST_DATA_PATH / "mini_testfile.csv"
+WAFER_FILE = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+
+
+def test_reader_stats():
+    calls = []
+    reader = TableBuilderReader.from_mmap(MINI_FILE)
+    reader.stats = ReadStats(callback=lambda stage, seconds: calls.append((stage, seconds)))
+    reader.read_table(drop_totals="both")
+
+    stats = reader.stats
+    expected_stages = {"index_sections", "parse_headers", "read_data", "ffill", "set_index", "drop_totals"}
+    assert expected_stages <= set(stats.durations)
+    assert all(seconds >= 0 for seconds in stats.durations.values())
+    assert stats.input_size == MINI_FILE.stat().st_size
+    assert (stats.num_rows, stats.num_columns, stats.num_wafers) == (9, 10, 0)
+    assert {stage for stage, _ in calls} == set(stats.durations)
+    assert stats.peak_memory is None
+    assert stats_module.active() is None
+
+
+def test_context_manager_stats():
+    with ReadStats(trace_memory=True) as stats:
+        reader = TableBuilderReader.from_file(WAFER_FILE)
+        dict(reader.iter_wafers())
+    assert "read_file" in stats.durations
+    assert stats.num_wafers == 4
+    assert stats.num_rows == 4 * 138
+    assert stats.peak_memory > 0
+    record = stats.as_dict()
+    assert record["num_wafers"] == 4 and "read_data_seconds" in record
+
+
+def test_stats_disabled():
+    reader = TableBuilderReader.from_file(MINI_FILE)
+    assert reader.stats is None
+    reader.read_table()
+    assert stats_module.active() is None
+    with stats_module.stage("anything") as stage:
+        assert stage is None
+
+
+@pytest.mark.parametrize("method", ["read_table_to_long_format", "read_table_to_long_records"])
+def test_long_format_stats(method):
+    reader = TableBuilderReader.from_file(WAFER_FILE)
+    reader.stats = ReadStats()
+    getattr(reader, method)()
+    assert reader.stats.num_rows == 4 * 138
+    assert "read_data" in reader.stats.durations
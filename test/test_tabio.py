@@ -1,17 +1,33 @@
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 from pathlib import Path
 
 import pandas as pd
 from pandas.testing import assert_frame_equal
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from table_builder_io.buffer import iter_lines
 from table_builder_io.reader import (
+    LazyWafers,
     TableBuilderReader,
     _extract_header,
     _extract_footer,
+    _parse_data_headers,
     _parse_main_table,
+    _split_header_line,
+)
+from table_builder_io.regexes import (
+    ABS_HEADER_METADATA_PATTERN,
+    ABS_FOOTER_METADATA_PATTERN,
+    RE_QUOTE_WRAPPED_CSV_SPLITTER_AND_CS,
 )
-from table_builder_io.regexes import ABS_HEADER_METADATA_PATTERN, ABS_FOOTER_METADATA_PATTERN
+from table_builder_io.testing import make_table_builder_csv
 from csv_test_cases import (
     MULTILEVEL_ROWS_TEST_DATA,
     MULTILEVEL_ROWS2_TEST_DATA,
@@ -26,6 +42,7 @@ from csv_test_cases import (
     MULTILEVEL_MULTIINDEX_EXPECTED,
     MUTTILEVEL_RAGGED_FFILL_TEST,
     FILTERS_2021_DATA_TEST_DATA,
+    ESCAPED_QUOTES_DATA_TEST_DATA,
 )
 
 
@@ -40,11 +57,22 @@ TESTS = [
     OD_DATA1_TEST_DATA,
     COL_MULTIINDEX_DATA_TEST_DATA,
     FILTERS_2021_DATA_TEST_DATA,
+    ESCAPED_QUOTES_DATA_TEST_DATA,
 ]
 
 TEST_DATA_PATH = Path(__file__).parent
 
 
+def assert_tables_equal(expected, actual):
+    """Assert two results of `read_table` are equal, either frames or dicts of wafer frames"""
+    if isinstance(expected, dict):
+        assert list(expected.keys()) == list(actual.keys())
+        for wafer_name, df in expected.items():
+            assert_frame_equal(df, actual[wafer_name])
+    else:
+        assert_frame_equal(expected, actual)
+
+
 class TestMetadataSplitting(unittest.TestCase):
     def test_header_extraction(self):
         """If something breaks/ adding a new test file format, test getting the header right here first."""
@@ -134,6 +162,58 @@ class SpecificCaseChecks(unittest.TestCase):
             self.assertEqual(df.shape, (138, 138))
             self.assertTrue((df.dtypes == "int64").all)
 
+    def test_iter_wafers(self):
+        path = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+        expected = TableBuilderReader.from_file(path).read_table(as_index=True)
+        for reader in [TableBuilderReader.from_file(path), TableBuilderReader.from_mmap(path)]:
+            wafers = reader.iter_wafers(as_index=True)
+            titles = []
+            for title, df in wafers:
+                titles.append(title)
+                assert_frame_equal(expected[title], df)
+            self.assertEqual(list(expected.keys()), titles)
+
+    def test_parallel_wafers(self):
+        path = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+        expected = TableBuilderReader.from_file(path).read_table(as_index=True)
+        with ThreadPoolExecutor(2) as pool:
+            for reader in [TableBuilderReader.from_file(path), TableBuilderReader.from_mmap(path)]:
+                for kwargs in [dict(workers=2), dict(executor=pool)]:
+                    with self.subTest(reader=reader, **kwargs):
+                        actual = reader.read_table(as_index=True, **kwargs)
+                        assert_tables_equal(expected, actual)
+
+    def test_iter_wafers_no_wafers(self):
+        reader = TableBuilderReader.from_file(TEST_DATA_PATH / "mini_testfile.csv")
+        with self.assertRaises(ValueError):
+            list(reader.iter_wafers())
+
+    def test_lazy_wafers(self):
+        path = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+        expected = TableBuilderReader.from_file(path).read_table(as_index=False)
+        for reader in [TableBuilderReader.from_file(path), TableBuilderReader.from_mmap(path)]:
+            with self.subTest(reader=reader):
+                wafers = reader.read_table(as_index=False, lazy=True)
+                self.assertIsInstance(wafers, LazyWafers)
+                self.assertEqual(list(expected.keys()), list(wafers.keys()))
+                self.assertEqual(len(expected), len(wafers))
+                self.assertFalse(any(wafers.is_parsed(title) for title in wafers))
+
+                assert_frame_equal(expected["Labourers"], wafers["Labourers"])
+                self.assertEqual([wafers.is_parsed(title) for title in wafers], [False, False, True, False])
+                self.assertIs(wafers["Labourers"], wafers["Labourers"])  # memoised
+                self.assertIn("Labourers", repr(wafers))
+                with self.assertRaises(KeyError):
+                    wafers["Not a wafer"]
+                for title, df in wafers.items():
+                    assert_frame_equal(expected[title], df)
+
+    def test_lazy_no_wafers(self):
+        reader = TableBuilderReader.from_file(TEST_DATA_PATH / "mini_testfile.csv")
+        assert_frame_equal(reader.read_table(lazy=True), reader.read_table())
+        with self.assertRaises(ValueError):
+            reader.read_table(lazy=True, workers=2)
+
     def test_header_ffilling(self):
         # Test that ffill correctly densely populates the ragged multiindices
         # (in the truncated tests above there isn't enough information for the ffill to be completely correct)
@@ -152,3 +232,172 @@ class SpecificCaseChecks(unittest.TestCase):
         path = TEST_DATA_PATH / "mini_testfile_dataset_footer_variant2.csv"
         reader = TableBuilderReader.from_file(path)
         assert_frame_equal(reader.read(as_index=True), MUTTILEVEL_RAGGED_FFILL_TEST)
+
+    def test_escaped_quotes_in_row_labels(self):
+        # quoted row labels containing "" escaped quotes are read alike by every engine and way of reading
+        reader = TableBuilderReader.from_string(ESCAPED_QUOTES_DATA_TEST_DATA.get_full_test_doc())
+        expected = reader.read_table()
+        self.assertIn(('Managers "Senior" level', 'Bay "North", Sydney'), expected.index)
+        for engine in ["c", "numpy"] + (["pyarrow"] if pyarrow is not None else []):
+            with self.subTest(engine=engine):
+                assert_frame_equal(reader.read_table(engine=engine), expected)
+                assert_frame_equal(reader.read_table(engine=engine, sparse=True).sparse.to_dense(), expected)
+                selected = reader.read_table(engine=engine, rows=lambda labels: '"' in labels[1])
+                assert_frame_equal(selected, expected.iloc[[1]])
+                assert_frame_equal(pd.concat(reader.read_table(engine=engine, chunksize=1)), expected)
+        records = reader.read_table_to_long_records()
+        self.assertEqual(records["SAL (UR)"].tolist()[3:6], ['Bay "North", Sydney'] * 3)
+        self.assertEqual(records["OCCP Occupation"].tolist()[:6], ['Managers "Senior" level'] * 6)
+
+
+class TestMmapReader(unittest.TestCase):
+    """The memory mapped reader should give identical results to the line based reader."""
+
+    def test_test_cases(self):
+        for test_case in TESTS:
+            with self.subTest(header=test_case.header), tempfile.TemporaryDirectory() as tmpdir:
+                path = Path(tmpdir) / "data.csv"
+                path.write_text(test_case.get_full_test_doc())
+                expected = TableBuilderReader.from_string(test_case.get_full_test_doc())
+                actual = TableBuilderReader.from_mmap(path)
+                self.assertEqual(expected.split_metadata(), actual.split_metadata())
+                assert_tables_equal(expected.read_table(), actual.read_table())
+
+    def test_section_index(self):
+        path = TEST_DATA_PATH / "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"
+        text_reader = TableBuilderReader.from_file(path)
+        mmap_reader = TableBuilderReader.from_mmap(path)
+        # file is ascii, so character and byte offsets agree
+        self.assertEqual(text_reader.section_index, mmap_reader.section_index)
+
+        index = text_reader.section_index
+        contents = path.read_text()
+        header, body, footer = text_reader.split_metadata()
+        self.assertEqual(contents[slice(*index.header)], header)
+        self.assertEqual(contents[slice(*index.body)], body)
+        self.assertEqual(contents[slice(*index.footer)], footer)
+        expected_titles = ["Technicians and Trades Workers", "Machinery Operators and Drivers", "Labourers", "Total"]
+        self.assertEqual([title for title, _ in index.wafers], expected_titles)
+        for _, (start, end) in index.wafers:
+            self.assertTrue(contents[start:end].startswith('"SA2 (UR)"'))
+            self.assertTrue(contents[start:end].endswith(","))
+
+    def test_files(self):
+        for name in [
+            "mini_testfile.csv",
+            "mini_testfile_dataset_footer_variant2.csv",
+            "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv",
+        ]:
+            with self.subTest(name=name):
+                expected = TableBuilderReader.from_file(TEST_DATA_PATH / name)
+                actual = TableBuilderReader.from_mmap(TEST_DATA_PATH / name)
+                self.assertEqual(expected.lines, actual.lines)
+                self.assertEqual(expected.read_header_metadata(), actual.read_header_metadata())
+                assert_tables_equal(expected.read_table(as_index=False), actual.read_table(as_index=False))
+
+
+class TestNumpyEngine(unittest.TestCase):
+    """engine="numpy" should give identical results to the default c engine."""
+
+    def test_test_cases(self):
+        for test_case in TESTS:
+            with self.subTest(header=test_case.header):
+                reader = TableBuilderReader.from_string(test_case.get_full_test_doc())
+                assert_tables_equal(reader.read_table(), reader.read_table(engine="numpy"))
+                res = _parse_main_table(reader.raw_body, engine="numpy")
+                assert_frame_equal(res._df[res.index_headers], test_case.index_cols_df)
+
+    def test_files(self):
+        for name in ["mini_testfile.csv", "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"]:
+            for reader in [
+                TableBuilderReader.from_file(TEST_DATA_PATH / name),
+                TableBuilderReader.from_mmap(TEST_DATA_PATH / name),
+            ]:
+                with self.subTest(name=name, reader=reader):
+                    assert_tables_equal(reader.read_table(), reader.read_table(engine="numpy"))
+                    assert_tables_equal(
+                        reader.read_table(as_index=False), reader.read_table(as_index=False, engine="numpy")
+                    )
+
+    def test_non_integer_cells(self):
+        doc = MULTILEVEL_ROWS.replace('999,999,\n,,"10-19 years"', '999,9.5,\n,,"10-19 years"')
+        reader = TableBuilderReader.from_string(doc)
+        reader.read_table(engine="c")
+        with self.assertRaisesRegex(ValueError, "integer cells"):
+            reader.read_table(engine="numpy")
+
+    def test_unknown_engine(self):
+        reader = TableBuilderReader.from_string(MULTILEVEL_ROWS)
+        with self.assertRaises(ValueError):
+            reader.read_table(engine="python")
+
+
+@unittest.skipIf(pyarrow is None, "engine='pyarrow' requires pyarrow")
+class TestPyarrowEngine(unittest.TestCase):
+    """engine="pyarrow" should give identical results to the default c engine."""
+
+    def test_test_cases(self):
+        for test_case in TESTS:
+            with self.subTest(header=test_case.header):
+                reader = TableBuilderReader.from_string(test_case.get_full_test_doc())
+                assert_tables_equal(reader.read_table(), reader.read_table(engine="pyarrow"))
+                expected = _parse_main_table(reader.raw_body)
+                res = _parse_main_table(reader.raw_body, engine="pyarrow")
+                assert_frame_equal(res._df, expected._df)
+                self.assertEqual(res._column_headers, expected._column_headers)
+
+    def test_files(self):
+        for name in ["mini_testfile.csv", "sa2_pow_vs_sa2_ur_bne_bc_worker_total_wafer.csv"]:
+            for reader in [
+                TableBuilderReader.from_file(TEST_DATA_PATH / name),
+                TableBuilderReader.from_mmap(TEST_DATA_PATH / name),
+            ]:
+                with self.subTest(name=name, reader=reader):
+                    assert_tables_equal(reader.read_table(), reader.read_table(engine="pyarrow"))
+                    assert_tables_equal(
+                        reader.read_table(drop_totals="both"), reader.read_table(drop_totals="both", engine="pyarrow")
+                    )
+        reader = TableBuilderReader.from_file(TEST_DATA_PATH / "mini_testfile.csv")
+        assert_frame_equal(reader.read_table(engine="pyarrow"), MUTTILEVEL_RAGGED_FFILL_TEST)
+
+    def test_non_integer_cells(self):
+        doc = MULTILEVEL_ROWS.replace('999,999,\n,,"10-19 years"', '999,9.5,\n,,"10-19 years"')
+        reader = TableBuilderReader.from_string(doc)
+        with self.assertRaisesRegex(ValueError, "integer cells"):
+            reader.read_table(engine="pyarrow")
+
+
+class TestHeaderTokenizer(unittest.TestCase):
+    LINES = [
+        ',"STATE","New South Wales","Victoria","Total",',
+        ',,"C0 Variable","a, with comma","",,"b",',
+        '"SEXP Sex","FMGF - 1 Digit Level",',
+        ',"STATE","no trailing comma"',
+        ',unquoted,"x",',
+        ',"escaped ""quote""","y",',
+        ',"stray " quote",',
+        ",,,",
+        "",
+    ]
+
+    def test_split_header_line(self):
+        for line in self.LINES:
+            with self.subTest(line=line):
+                self.assertEqual(_split_header_line(line), RE_QUOTE_WRAPPED_CSV_SPLITTER_AND_CS.findall(line))
+
+    def test_wide_multilevel_headers(self):
+        text = make_table_builder_csv(num_rows=3, num_cols=3000, row_levels=3, col_levels=3)
+        body = TableBuilderReader.from_string(text).raw_body
+        # a blank before the first label of the outer level, which is left missing rather than filled
+        body = body.replace('"C0 Column Variable 0","C0 label 0"', '"C0 Column Variable 0",', 1)
+        expected = {}  # as split and filled by regex and pd.Series.ffill
+        for line in body.splitlines()[:3]:
+            label, *labels = RE_QUOTE_WRAPPED_CSV_SPLITTER_AND_CS.findall(line)[2:]
+            expected[label] = pd.Series([x if x != "" else pd.NA for x in labels], dtype="string").ffill().tolist()
+
+        result = _parse_data_headers(iter_lines(body, 0, len(body)))
+        self.assertEqual(result.col_headers_map, expected)
+        self.assertIs(result.col_headers_map["C0 Column Variable 0"][0], pd.NA)
+        self.assertEqual(result.num_col_index_cols, len(expected["C2 Column Variable 2"]))
+        self.assertEqual(result.row_headers, ["R0 Row Variable 0", "R1 Row Variable 1", "R2 Row Variable 2"])
+        self.assertEqual(result.num_header_lines, 4)
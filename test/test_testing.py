@@ -0,0 +1,48 @@
+import pytest
+from pandas.testing import assert_frame_equal
+
+from table_builder_io import TableBuilderReader
+from table_builder_io.testing import make_table_builder_csv, write_table_builder_csv
+
+
+@pytest.mark.parametrize("row_levels, col_levels, num_wafers", [(1, 1, 0), (3, 1, 0), (2, 2, 0), (1, 1, 3), (2, 3, 2)])
+@pytest.mark.parametrize("census_year", [2016, 2021])
+def test_generated_file_round_trip(row_levels, col_levels, num_wafers, census_year):
+    doc = make_table_builder_csv(
+        50,
+        12,
+        row_levels=row_levels,
+        col_levels=col_levels,
+        num_wafers=num_wafers,
+        filters=[("STATE (UR)", "Queensland")],
+        census_year=census_year,
+    )
+    reader = TableBuilderReader.from_string(doc)
+    header = reader.read_header_metadata()
+    assert header.filters == ["STATE (UR)==Queensland"]
+    assert header.dataset.startswith(str(census_year))
+
+    result = reader.read_table()
+    tables = result if num_wafers else {None: result}
+    assert len(tables) == max(num_wafers, 1)
+    for df in tables.values():
+        assert df.index.nlevels == row_levels
+        assert df.columns.nlevels == col_levels
+        assert len(df) >= 50 and len(df.columns) >= 12
+        assert (df.to_numpy() >= 0).all()
+
+    numpy_result = reader.read_table(engine="numpy")
+    for title, df in tables.items():
+        assert_frame_equal(df, numpy_result if title is None else numpy_result[title])
+
+
+def test_write_table_builder_csv(tmp_path):
+    path = write_table_builder_csv(tmp_path / "generated.csv", num_rows=10, num_cols=3, seed=1)
+    df = TableBuilderReader.from_mmap(path).read_table()
+    assert df.shape == (10, 3)
+    assert_frame_equal(df, TableBuilderReader.from_string(make_table_builder_csv(10, 3, seed=1)).read_table())
+
+
+def test_unsupported_layout():
+    with pytest.raises(ValueError):
+        make_table_builder_csv(row_levels=1, col_levels=2)